@@ -1,13 +1,121 @@
-from flask import Flask, render_template
+from flask import Flask, Response, jsonify, render_template, request
+from datetime import date
 import importlib, os
 
+import metrics
+
 app = Flask(__name__)
+PAGE_LENGTH = 25
+
+# Start loading data right away; the port is bound without waiting for it
+if os.environ.get("V20_WARMUP", "1") != "0":
+    importlib.import_module("strategy").warm_up()
+
+def _warming(strategy, as_json=False):
+    """Non-blocking response while the data is still loading, else None."""
+    if strategy.is_ready():
+        return None
+    strategy.warm_up()
+    state = strategy.readiness()
+    if as_json:
+        return jsonify(state), 503, {"Retry-After": "5"}
+    return render_template("warming.html", state=state), 503, {"Retry-After": "5"}
 
 @app.route("/")
 def home():
+    # Only the first page is rendered; DataTables fetches the rest from
+    # /api/datatable (server-side processing)
+    strategy = importlib.import_module("strategy")
+    warming = _warming(strategy)
+    if warming:
+        return warming
+    total, _, first_page = strategy.datatable_page(0, PAGE_LENGTH)
+    with metrics.STAGE_SECONDS.labels(stage="render").time():
+        return render_template("index.html", stocks=first_page, total=total,
+                               page_length=PAGE_LENGTH)
+
+def _float_arg(name):
+    value = request.args.get(name)
+    return None if value in (None, "") else float(value)
+
+def _date_arg(name):
+    value = request.args.get(name)
+    return None if value in (None, "") else date.fromisoformat(value).isoformat()
+
+@app.route("/api/signals")
+def api_signals():
+    """Scan results as JSON, filtered server-side.
+
+    Query parameters: ``symbol`` (comma-separated), ``start``/``end``
+    (YYYY-MM-DD, inclusive), ``min_move`` and ``max_proximity``.
+    """
+    strategy = importlib.import_module("strategy")
+    warming = _warming(strategy, as_json=True)
+    if warming:
+        return warming
+    try:
+        filters = dict(
+            symbols=[s.strip().upper() for s in request.args.get("symbol", "").split(",")
+                     if s.strip()],
+            start=_date_arg("start"),
+            end=_date_arg("end"),
+            min_move=_float_arg("min_move"),
+            max_proximity=_float_arg("max_proximity"),
+        )
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    signals = strategy.query_signals(**filters)
+    return jsonify(count=len(signals), signals=signals)
+
+@app.route("/api/datatable")
+def api_datatable():
+    """DataTables server-side processing endpoint."""
     strategy = importlib.import_module("strategy")
-    results = strategy.scan_stocks()
-    return render_template("index.html", stocks=results)
+    warming = _warming(strategy, as_json=True)
+    if warming:
+        return warming
+    args = request.args
+    try:
+        draw = int(args.get("draw", 0))
+        start = max(int(args.get("start", 0)), 0)
+        length = int(args.get("length", PAGE_LENGTH))
+        order_col = args.get("order[0][column]")
+        order_col = None if order_col in (None, "") else int(order_col)
+        if order_col is not None and not 0 <= order_col < len(strategy.RESULT_COLUMNS):
+            raise ValueError(f"order column out of range: {order_col}")
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    total, filtered, rows = strategy.datatable_page(
+        start, length, order_col,
+        descending=args.get("order[0][dir]") == "desc",
+        search=args.get("search[value]", "").strip(),
+    )
+    return jsonify(
+        draw=draw,
+        recordsTotal=total,
+        recordsFiltered=filtered,
+        data=[[row[col] for col in strategy.RESULT_COLUMNS] for row in rows],
+    )
+
+@app.route("/health")
+def health():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify(status="ok")
+
+@app.route("/ready")
+def ready():
+    """Readiness probe: 200 once data is loaded and scanned, else 503.
+
+    The body carries data age, loaded symbol count, download and scan
+    durations and the result count either way.
+    """
+    state = importlib.import_module("strategy").readiness()
+    return jsonify(state), 200 if state["status"] == "ready" else 503
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target for this worker."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
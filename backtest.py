@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+backtest.py – Vectorized V20 signal backtest
+For every signal: entry is the first candle after the signal date whose
+low touches BuyAt; exit is the first later candle whose high reaches
+SellAt. Trades that never reach SellAt stay open and are marked to the
+symbol's last close. Signals are processed in blocks, each one a
+(signals x dates) comparison against the float32 panel, so the whole
+universe runs in seconds.
+
+    report = backtest.backtest(strategy.scan_stocks())
+    report["summary"]["hit_rate"], report["by_symbol"][:5]
+"""
+
+import numpy as np
+import pandas as pd
+
+import strategy
+from panel import FIELDS
+
+BLOCK = 2048  # signals per (signals x dates) block
+
+
+def simulate(bulk, tickers: list[str], sym: np.ndarray, signal_row: np.ndarray,
+             buy: np.ndarray, sell: np.ndarray) -> dict:
+    """Trade outcome per signal, all inputs aligned arrays.
+
+    ``sym`` indexes ``tickers``; ``signal_row`` is the row of ``bulk.dates``
+    the signal closed on. Rows are panel rows (trading days), and missing
+    candles never touch a level. Returns arrays ``entered``, ``hit``,
+    ``entry_row``, ``exit_row`` (last row for open trades), ``hold_bars``,
+    ``return_pct`` and ``max_drawdown_pct`` (NaN where not entered).
+    """
+    n_sig, n_rows = len(sym), len(bulk)
+    out = {name: np.zeros(n_sig, dtype=bool) for name in ("entered", "hit")}
+    out.update({name: np.full(n_sig, -1, dtype=np.intp)
+                for name in ("entry_row", "exit_row", "hold_bars")})
+    out.update({name: np.full(n_sig, np.nan) for name in ("return_pct", "max_drawdown_pct")})
+    if n_rows == 0:
+        return out   # no candles: nothing can enter
+
+    cube = bulk.take(tickers)
+    lows, highs, closes = (cube[FIELDS.index(f)] for f in ('Low', 'High', 'Close'))
+    has_close = ~np.isnan(closes)
+    last_row = np.where(has_close.any(axis=1),
+                        n_rows - 1 - np.argmax(has_close[:, ::-1], axis=1), -1)
+    last_close = closes[np.arange(len(tickers)), np.maximum(last_row, 0)].astype(float)
+    pos = np.arange(n_rows)[None, :]
+    for lo in range(0, n_sig, BLOCK):
+        blk = slice(lo, lo + BLOCK)
+        j, buy_b, sell_b = sym[blk], buy[blk, None], sell[blk, None]
+        low, high = lows[j], highs[j]
+
+        # Signals dated outside the panel (row -1) never enter
+        touch = (pos > signal_row[blk, None]) & (low <= buy_b) & (signal_row[blk, None] >= 0)
+        entered = touch.any(axis=1)
+        entry = np.argmax(touch, axis=1)
+        reach = (pos > entry[:, None]) & (high >= sell_b) & entered[:, None]
+        hit = reach.any(axis=1)
+        exit_ = np.where(hit, np.argmax(reach, axis=1), last_row[j])
+
+        held = (pos >= entry[:, None]) & (pos <= exit_[:, None]) & ~np.isnan(low)
+        trough = np.where(held, low, np.inf).min(axis=1).astype(float)
+        buy_f = buy_b[:, 0].astype(float)
+        exit_price = np.where(hit, sell_b[:, 0], last_close[j])
+        out["entered"][blk], out["hit"][blk] = entered, hit
+        out["entry_row"][blk] = np.where(entered, entry, -1)
+        out["exit_row"][blk] = np.where(entered, exit_, -1)
+        out["hold_bars"][blk] = np.where(entered, exit_ - entry, -1)
+        out["return_pct"][blk] = np.where(entered, (exit_price - buy_f) / buy_f * 100, np.nan)
+        out["max_drawdown_pct"][blk] = np.where(entered, (trough - buy_f) / buy_f * 100, np.nan)
+    return out
+
+
+# Additive per-group totals; shards combine by summing, except the
+# drawdown column which combines by min
+TOTALS = ("signals", "entered", "hits", "return_sum", "hold_sum", "worst_drawdown")
+
+
+def totals(trades: dict, group: np.ndarray, n_groups: int) -> np.ndarray:
+    """``(n_groups, len(TOTALS))`` totals of the trades in each group."""
+    entered, hit = trades["entered"], trades["hit"]
+    worst = np.full(n_groups, np.inf)
+    np.minimum.at(worst, group[entered], trades["max_drawdown_pct"][entered])
+    return np.column_stack([
+        np.bincount(group, minlength=n_groups),
+        np.bincount(group[entered], minlength=n_groups),
+        np.bincount(group[hit], minlength=n_groups),
+        np.bincount(group[entered], trades["return_pct"][entered], minlength=n_groups),
+        np.bincount(group[hit], trades["hold_bars"][hit], minlength=n_groups),
+        worst,
+    ]).astype(float)
+
+
+def metrics(tot: np.ndarray) -> list[dict]:
+    """Signals, entries, hits, hit rate, mean return, mean holding period of
+    hits and worst drawdown per row of ``totals``; None where undefined."""
+    signals, n_in, n_hit, ret, hold, worst = tot.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns = {
+            "signals": signals.astype(int), "entered": n_in.astype(int),
+            "hits": n_hit.astype(int),
+            "hit_rate": np.where(n_in > 0, n_hit / n_in, np.nan),
+            "avg_return_pct": np.where(n_in > 0, ret / n_in, np.nan),
+            "avg_hold_bars": np.where(n_hit > 0, hold / n_hit, np.nan),
+            "max_drawdown_pct": np.where(n_in > 0, worst, np.nan),
+        }
+    return [
+        {name: (None if value != value else value) for name, value in zip(columns, values)}
+        for values in zip(*(col.tolist() for col in columns.values()))
+    ]
+
+
+def summarize(trades: dict, group: np.ndarray, n_groups: int) -> list[dict]:
+    """``metrics`` for each of ``n_groups`` groups of trades."""
+    return metrics(totals(trades, group, n_groups))
+
+
+def backtest(signals: list[dict] | None = None, bulk=None) -> dict:
+    """Backtest scan result rows (``scan_stocks()`` format) on the panel.
+
+    Returns ``trades`` (one row per signal: the signal's fields plus
+    ``Entered``, ``EntryDate``, ``ExitDate``, ``Hit``, ``HoldBars``,
+    ``Return%`` and ``MaxDrawdown%``), ``by_symbol`` and ``summary``.
+    """
+    bulk = strategy._get_bulk() if bulk is None else bulk
+    signals = strategy.scan_stocks() if signals is None else signals
+    symbols = list(dict.fromkeys(row['Symbol'] for row in signals))
+    index = {s: j for j, s in enumerate(symbols)}
+    sym = np.array([index[row['Symbol']] for row in signals], dtype=np.intp)
+    signal_row = bulk.dates.get_indexer(pd.DatetimeIndex([row['SignalDate'] for row in signals]))
+    buy = np.array([row['BuyAt'] for row in signals], dtype=float)
+    sell = np.array([row['SellAt'] for row in signals], dtype=float)
+
+    trades = simulate(bulk, [s + ".NS" for s in symbols], sym, signal_row, buy, sell)
+    dates = [str(d.date()) for d in bulk.dates]
+    rows = []
+    for signal, entered, hit, entry, exit_, hold, ret, dd in zip(
+            signals, trades["entered"].tolist(), trades["hit"].tolist(),
+            trades["entry_row"].tolist(), trades["exit_row"].tolist(),
+            trades["hold_bars"].tolist(), trades["return_pct"].tolist(),
+            trades["max_drawdown_pct"].tolist()):
+        rows.append(dict(
+            signal,
+            Entered=entered,
+            EntryDate=dates[entry] if entered else None,
+            ExitDate=dates[exit_] if hit else None,
+            Hit=hit,
+            HoldBars=hold if entered else None,
+            **{'Return%': round(ret, 2) if entered else None,
+               'MaxDrawdown%': round(dd, 2) if entered else None},
+        ))
+    by_symbol = [dict(symbol=s, **row) for s, row in
+                 zip(symbols, summarize(trades, sym, len(symbols)))]
+    summary = summarize(trades, np.zeros(len(sym), dtype=np.intp), 1)[0]
+    return {"trades": rows, "by_symbol": by_symbol, "summary": summary}
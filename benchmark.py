@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+benchmark.py – Scanner benchmark on a seeded synthetic panel
+Times each stage of a scan (load, MA200, signal detection, sort, render)
+and records peak traced memory per stage. The served paths are timed
+too: ``scan_stocks()`` as a full rescan, as an incremental scan building
+its state from scratch and as one advancing a day, and the per-symbol
+``get_df`` + ``find_v20_signals`` loop. Runs fully offline.
+
+    python benchmark.py --symbols 2000 --days 750 --rally-prob 0.01 \\
+        --json bench.json --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import providers
+import store
+import strategy
+from panel import PricePanel
+
+# Importing app must not start a real download
+os.environ.setdefault("V20_WARMUP", "0")
+
+STAGES = ["load", "ma200", "signals", "sort", "render"]
+# Code that serves requests, timed through strategy's public entry points
+SERVED_STAGES = ["scan_full", "scan_cold", "scan_delta", "per_symbol"]
+
+
+def synthetic_panel(n_symbols: int, n_days: int, seed: int = 0,
+                    rally_prob: float = 0.01) -> tuple[PricePanel, list[str]]:
+    """Return ``(bulk, symbols)``: ``n_days`` business days for ``n_symbols``."""
+    symbols = [f"SYN{i:05d}" for i in range(n_symbols)]
+    dates = pd.bdate_range("2020-01-01", periods=n_days + 1)
+    provider = providers.SyntheticProvider(seed, rally_prob, epoch=str(dates[0].date()))
+    bulk = provider.download([s + ".NS" for s in symbols],
+                             str(dates[0].date()), str(dates[-1].date()))
+    return PricePanel.from_frame(bulk), symbols
+
+
+def _render(results: list[dict]) -> str:
+    from flask import render_template
+    from app import app, PAGE_LENGTH
+
+    with app.test_request_context("/"):
+        return render_template("index.html", stocks=results[:PAGE_LENGTH],
+                               total=len(results), page_length=PAGE_LENGTH)
+
+
+def _run_stages(store_dir: str, symbols: list[str]) -> dict:
+    """One full scan, returning seconds per stage plus the signal count."""
+    out = {}
+
+    def stage(name, fn, *args):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        out[name] = time.perf_counter() - t0
+        return result
+
+    def load():
+        bulk, _ = store.load_panel(store_dir)
+        return bulk, strategy._panel_arrays(bulk, symbols)
+
+    bulk, arrays = stage("load", load)
+    ma200 = stage("ma200", strategy._panel_ma200, arrays[-1])
+    results = stage("signals", strategy._panel_signals,
+                    bulk.dates, symbols, *arrays, ma200)
+    results = stage("sort", strategy._sort_results, results)
+    stage("render", _render, results)
+    out["signal_count"] = len(results)
+    return out
+
+
+@contextmanager
+def _serving(symbols: list[str]):
+    """Point strategy at the benchmark universe, without a store."""
+    names = ("all_stocks", "STORE_DIR", "INCREMENTAL_SCAN", "_snapshot", "_scan_cache",
+             "_ma_state", "_scan_state", "_views")
+    saved = {name: getattr(strategy, name) for name in names}
+    strategy.all_stocks, strategy.STORE_DIR = symbols, ""
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(strategy, name, value)
+
+
+def _served_stages(bulk: PricePanel, symbols: list[str]) -> dict:
+    """``{stage: (setup, timed)}``; setup publishes a snapshot the timed
+    call has not seen yet, so every scan is a cache miss."""
+    def fresh(incremental):
+        strategy.INCREMENTAL_SCAN = incremental
+        strategy._ma_state = strategy._scan_state = None
+        strategy._set_bulk(bulk)
+
+    def one_day_behind():
+        fresh(True)
+        strategy._set_bulk(bulk.slice(None, -1))
+        strategy.scan_stocks()
+        strategy._set_bulk(bulk, lineage=strategy._snapshot.lineage)
+
+    def per_symbol():
+        for symbol in symbols:
+            df = strategy.get_df(symbol)
+            if df is not None:
+                strategy.find_v20_signals(df)
+
+    return {"scan_full": (lambda: fresh(False), strategy.scan_stocks),
+            "scan_cold": (lambda: fresh(True), strategy.scan_stocks),
+            "scan_delta": (one_day_behind, strategy.scan_stocks),
+            "per_symbol": (lambda: fresh(True), per_symbol)}
+
+
+def _run_served(stages: dict) -> dict:
+    out = {}
+    for name, (setup, timed) in stages.items():
+        setup()
+        t0 = time.perf_counter()
+        timed()
+        out[name] = time.perf_counter() - t0
+    return out
+
+
+def _served_peaks(stages: dict) -> dict:
+    peaks = {}
+    for name, (setup, timed) in stages.items():
+        setup()
+        tracemalloc.start()
+        try:
+            timed()
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return peaks
+
+
+def _peak_memory(store_dir: str, symbols: list[str]) -> dict:
+    """Peak traced allocation (bytes) per stage, from a separate run."""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        bulk, _ = store.load_panel(store_dir)
+        tracemalloc.reset_peak()
+        arrays = strategy._panel_arrays(bulk, symbols)
+        peaks["load"] = tracemalloc.get_traced_memory()[1]
+
+        tracemalloc.reset_peak()
+        ma200 = strategy._panel_ma200(arrays[-1])
+        peaks["ma200"] = tracemalloc.get_traced_memory()[1]
+
+        tracemalloc.reset_peak()
+        results = strategy._panel_signals(bulk.dates, symbols, *arrays, ma200)
+        peaks["signals"] = tracemalloc.get_traced_memory()[1]
+
+        tracemalloc.reset_peak()
+        strategy._sort_results(results)
+        peaks["sort"] = tracemalloc.get_traced_memory()[1]
+
+        tracemalloc.reset_peak()
+        _render(results)
+        peaks["render"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def run(n_symbols: int, n_days: int, seed: int, rally_prob: float, repeat: int) -> dict:
+    bulk, symbols = synthetic_panel(n_symbols, n_days, seed, rally_prob)
+    with tempfile.TemporaryDirectory() as store_dir:
+        store.save_panel(bulk, store_dir)
+        _render([])   # import app and compile the template outside the timings
+        runs = [_run_stages(store_dir, symbols) for _ in range(repeat)]
+        peaks = _peak_memory(store_dir, symbols)
+    with _serving(symbols):
+        served = _served_stages(bulk, symbols)
+        for r in runs:
+            r.update(_run_served(served))
+        peaks.update(_served_peaks(served))
+
+    return {
+        "params": {"symbols": n_symbols, "days": n_days, "seed": seed,
+                   "rally_prob": rally_prob, "repeat": repeat,
+                   "threshold": strategy.THRESHOLD_PERCENT},
+        "env": {"python": platform.python_version(), "machine": platform.machine(),
+                "numpy": np.__version__, "pandas": pd.__version__},
+        "signals": runs[0]["signal_count"],
+        "stages": {
+            name: {"median_s": statistics.median(r[name] for r in runs),
+                   "min_s": min(r[name] for r in runs),
+                   "peak_bytes": peaks[name]}
+            for name in STAGES + SERVED_STAGES
+        },
+        "total_median_s": statistics.median(sum(r[n] for n in STAGES) for r in runs),
+    }
+
+
+def _print_report(report: dict, baseline: dict | None) -> None:
+    p = report["params"]
+    print(f"{p['symbols']} symbols x {p['days']} days, "
+          f"{report['signals']} signals, {p['repeat']} runs")
+    print(f"{'stage':<10} {'median ms':>10} {'min ms':>10} {'peak MiB':>10}"
+          + (f" {'vs base':>8}" if baseline else ""))
+    for name in STAGES + ["total"] + SERVED_STAGES:
+        if name == "total":
+            med, low, peak = report["total_median_s"], None, None
+        else:
+            st = report["stages"][name]
+            med, low, peak = st["median_s"], st["min_s"], st["peak_bytes"]
+        line = (f"{name:<10} {med * 1e3:>10.2f} "
+                f"{'' if low is None else f'{low * 1e3:.2f}':>10} "
+                f"{'' if peak is None else f'{peak / 2**20:.1f}':>10}")
+        if baseline:
+            base = (baseline["total_median_s"] if name == "total"
+                    else baseline["stages"].get(name, {}).get("median_s"))
+            line += f" {med / base:>7.2f}x" if base else f" {'-':>8}"
+        print(line)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--symbols", type=int, default=191)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--rally-prob", type=float, default=0.01,
+                        help="per-day chance of a green streak starting")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write the machine-readable report here")
+    parser.add_argument("--compare", help="earlier --json report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.symbols, args.days, args.seed, args.rally_prob, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    _print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+incremental.py – Persistent scanner state
+RollingMeans updates moving averages of every symbol's closes from
+running sums. ScanState holds what the streak scan carries from one
+candle to the next: the open green streak's low/high, the number of
+candles seen and every streak closed so far.
+Appending a day is O(symbols) for both; the full history is only walked
+once, when strategy bootstraps them.
+
+Both convert to plain arrays (``to_arrays``/``from_arrays``) so strategy
+can save them to the store and a restarted worker resumes from there.
+
+Closed streaks are stored before the THRESHOLD_PERCENT test (only the
+"low below MA" condition is applied), so a threshold change never needs
+a rescan.
+"""
+
+import numpy as np
+
+
+class RollingMeans:
+    """Running-sum moving averages for several windows, all symbols at once.
+
+    Only the running state is kept (the last ``w`` closes and their sum per
+    symbol); the MA history itself lives with the price panel. A value is
+    NaN where the symbol has no complete candle that day or fewer than
+    ``w`` so far.
+    """
+
+    def __init__(self, symbols: list[str], windows: tuple[int, ...], lineage):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.windows = tuple(windows)
+        self.lineage = lineage
+        self.count = np.zeros(n, dtype=np.int64)
+        # Last `w` closes per symbol; heads point at the oldest slot
+        self.rings = {w: np.full((w, n), np.nan) for w in self.windows}
+        self.heads = {w: np.zeros(n, dtype=np.intp) for w in self.windows}
+        self.sums = {w: np.zeros(n) for w in self.windows}
+
+    def to_arrays(self) -> dict:
+        """Plain arrays for ``np.savez`` (no pickling)."""
+        out = {"windows": np.array(self.windows), "count": self.count}
+        for w in self.windows:
+            out.update({f"ring{w}": self.rings[w], f"head{w}": self.heads[w],
+                        f"sum{w}": self.sums[w]})
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays, symbols: list[str], lineage) -> "RollingMeans":
+        means = cls(symbols, tuple(arrays["windows"].tolist()), lineage)
+        means.count = arrays["count"]
+        for w in means.windows:
+            means.rings[w], means.heads[w] = arrays[f"ring{w}"], arrays[f"head{w}"]
+            means.sums[w] = arrays[f"sum{w}"]
+        return means
+
+    def peek(self, closes, valid) -> dict:
+        """Moving averages if one more candle row were added; no mutation."""
+        j = np.flatnonzero(valid)
+        count = self.count.copy()
+        count[j] += 1
+        out = {}
+        for w in self.windows:
+            sums = self.sums[w].copy()
+            sums[j] += closes[j] - np.nan_to_num(self.rings[w][self.heads[w][j], j])
+            out[w] = np.where(valid & (count >= w), sums / w, np.nan)
+        return out
+
+    def advance(self, dates, closes, valid) -> dict:
+        """Add candle rows (dates x symbols); returns the new MA rows per window."""
+        rows = {w: np.full(closes.shape, np.nan) for w in self.windows}
+        for t in range(len(dates)):
+            j = np.flatnonzero(valid[t])
+            c = closes[t, j]
+            self.count[j] += 1
+            for w in self.windows:
+                ring, head = self.rings[w], self.heads[w]
+                slot = head[j]
+                self.sums[w][j] += c - np.nan_to_num(ring[slot, j])
+                ring[slot, j] = c
+                head[j] = (slot + 1) % w
+                rows[w][t, j] = np.where(self.count[j] >= w, self.sums[w][j] / w, np.nan)
+        return rows
+
+
+class ScanState:
+    """Scanner state for a fixed symbol list, committed up to ``last_date``.
+
+    ``window`` is the MA length used by the "low below MA" test; the MA
+    itself comes from RollingMeans.
+    """
+
+    def __init__(self, symbols: list[str], lineage, window: int = 200):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.lineage = lineage      # identifies the price history this state follows
+        self.window = window
+        self.last_date = None       # last committed candle date (np.datetime64)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.in_streak = np.zeros(n, dtype=bool)
+        self.streak_low = np.full(n, np.inf)
+        self.streak_high = np.full(n, -np.inf)
+        self.last_close = np.full(n, np.nan)
+        self._closed = []           # chunks of (sym, date, low, high, ma)
+
+    def copy(self) -> "ScanState":
+        """Independent per-symbol arrays; closed-streak chunks are shared."""
+        other = object.__new__(ScanState)
+        other.__dict__.update(self.__dict__)
+        for name in ("count", "in_streak", "streak_low", "streak_high", "last_close"):
+            setattr(other, name, getattr(self, name).copy())
+        other._closed = list(self._closed)
+        return other
+
+    def to_arrays(self) -> dict:
+        """Plain arrays for ``np.savez`` (no pickling)."""
+        sym, dates, low, high, ma = self.closed_streaks()
+        return {"symbols": np.array(self.symbols), "window": np.array(self.window),
+                "last_date": np.datetime64(self.last_date, "ns"),
+                "count": self.count, "in_streak": self.in_streak,
+                "streak_low": self.streak_low, "streak_high": self.streak_high,
+                "last_close": self.last_close, "closed_sym": sym, "closed_date": dates,
+                "closed_low": low, "closed_high": high, "closed_ma": ma}
+
+    @classmethod
+    def from_arrays(cls, arrays, lineage) -> "ScanState":
+        state = cls(arrays["symbols"].tolist(), lineage, int(arrays["window"]))
+        last_date = arrays["last_date"][()]
+        state.last_date = None if np.isnat(last_date) else last_date
+        for name in ("count", "in_streak", "streak_low", "streak_high", "last_close"):
+            setattr(state, name, arrays[name])
+        state.record_closed(*(arrays[f"closed_{k}"] for k in ("sym", "date", "low", "high", "ma")))
+        return state
+
+    def record_closed(self, sym, dates, low, high, ma) -> None:
+        if len(sym):
+            self._closed.append((np.asarray(sym, dtype=np.intp),
+                                 np.asarray(dates, dtype="datetime64[ns]"),
+                                 np.asarray(low, dtype=float),
+                                 np.asarray(high, dtype=float),
+                                 np.asarray(ma, dtype=float)))
+
+    def closed_streaks(self):
+        """``(sym, date, low, high, ma)`` arrays of every closed streak."""
+        if not self._closed:
+            return (np.empty(0, dtype=np.intp), np.empty(0, dtype="datetime64[ns]"),
+                    np.empty(0), np.empty(0), np.empty(0))
+        if len(self._closed) > 1:
+            self._closed = [tuple(np.concatenate(parts) for parts in zip(*self._closed))]
+        return self._closed[0]
+
+    def advance(self, dates, opens, highs, lows, closes, valid, ma) -> None:
+        """Apply candles row by row; arrays are (new dates x symbols).
+
+        ``valid[t, j]`` is False where symbol ``j`` has no complete candle
+        on ``dates[t]``; such cells are skipped exactly like ``dropna()``.
+        ``ma`` holds the matching ``window``-day moving average rows.
+        """
+        cols = np.arange(len(self.symbols))
+        for t in range(len(dates)):
+            v = valid[t]
+            o, h, l, c = opens[t], highs[t], lows[t], closes[t]
+            started = self.count >= 1           # a symbol's first candle never counts
+            with np.errstate(invalid="ignore"):
+                green = v & started & (c > o)
+            closer = v & started & ~green
+            self.count[v] += 1
+            self.last_close[v] = c[v]
+
+            ending = closer & self.in_streak
+            if ending.any():
+                k = cols[ending]
+                k = k[self.streak_low[k] < ma[t, k]]
+                self.record_closed(k, np.full(len(k), dates[t], dtype="datetime64[ns]"),
+                                   self.streak_low[k], self.streak_high[k], ma[t, k])
+            self.in_streak[closer] = False
+            self.streak_low[closer] = np.inf
+            self.streak_high[closer] = -np.inf
+
+            self.streak_low[green] = np.minimum(self.streak_low[green], l[green])
+            self.streak_high[green] = np.maximum(self.streak_high[green], h[green])
+            self.in_streak[green] = True
+        if len(dates):
+            self.last_date = np.datetime64(dates[-1], "ns")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+metrics.py – Minimal Prometheus-style metrics
+Counters, gauges and histograms rendered in the Prometheus text format,
+without pulling in prometheus_client. Recording a sample is a lock plus
+a few additions, cheap enough to leave on in production. Values are per
+process, so each gunicorn worker exposes its own series.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+_REGISTRY = []
+
+# Seconds; spans a cached lookup up to a slow full download
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30, 60)
+
+
+def _fmt_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def _fmt_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self._children = {}
+        self._lock = threading.Lock()
+        if not labelnames:
+            self.labels()  # unlabelled series are exported from the start
+        _REGISTRY.append(self)
+
+    def labels(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        return self.labels() if not self.labelnames else None
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(child.samples(self.name, dict(zip(self.labelnames, key))))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [f"{name}{_fmt_labels(labels)} {_fmt_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = staticmethod(_CounterChild)
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.fn = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, fn) -> None:
+        """Compute the value at scrape time instead of on every update."""
+        self.fn = fn
+
+    def samples(self, name, labels):
+        value = self.value
+        if self.fn is not None:
+            try:
+                value = self.fn()
+            except Exception:
+                value = math.nan
+        return [f"{name}{_fmt_labels(labels)} {_fmt_value(value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _new_child = staticmethod(_GaugeChild)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def set_function(self, fn) -> None:
+        self._default().set_function(fn)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines, running = [], 0
+        for bound, count in zip(list(self.buckets) + [math.inf], counts):
+            running += count
+            le = dict(labels, le=_fmt_value(bound))
+            lines.append(f"{name}_bucket{_fmt_labels(le)} {running}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {running}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, doc, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in _REGISTRY for line in metric.render()) + "\n"
+
+
+# ── Scanner metrics ───────────────────────────────────────────────────
+STAGE_SECONDS = Histogram(
+    "v20_stage_seconds", "Latency of scanner stages.", ("stage",)
+)
+SCAN_CACHE = Counter(
+    "v20_scan_cache_total", "Scan result cache lookups.", ("result",)
+)
+FAILED_SYMBOLS = Counter(
+    "v20_failed_symbols_total", "Requested symbols that came back without data."
+)
+SIGNALS_EMITTED = Counter(
+    "v20_signals_emitted_total", "Signals produced by freshly computed scans."
+)
+PRICE_CACHE_BYTES = Gauge(
+    "v20_price_cache_bytes", "Bytes of price data referenced by the bulk cache."
+)
+DATA_AGE_SECONDS = Gauge(
+    "v20_data_age_seconds", "Age of the price snapshot being served."
+)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+optimize.py – Parallel V20 parameter search
+Grid (or random) search over signal threshold, MA window and look-back
+length, ranked by backtest metrics. Look-back is the number of trading
+days before the evaluation cut-off whose signals are traded; trades only
+see prices before the cut-off.
+
+Work is sharded by symbol across the scan process pool, with the float32
+panel placed in shared memory once per call. Each shard finds its green
+streaks once and, per cut-off, simulates the trades of the streaks in the
+longest look-back; every parameter set is then a mask reduced to additive
+totals, and the parent adds the shards up. Streak tables and trade
+outcomes are cached per worker, so later calls on the same panel (other
+grids, other cut-offs) only simulate what they have not seen.
+
+    ranked = optimize.optimize(thresholds=(10, 15, 20), ma_windows=(100, 200),
+                               lookbacks=(250, 500))
+    ranked[0]     # best parameter set with its backtest metrics
+"""
+
+import hashlib
+import itertools
+import os
+
+import numpy as np
+
+import backtest
+import strategy
+import sweep
+from panel import PricePanel
+
+CACHE_SIZE = 64  # streak tables + trade outcomes kept per process
+
+
+# ── Per-shard evaluation ──────────────────────────────────────────────
+_cache = {}
+
+
+def _cached(key, build):
+    if key not in _cache:
+        _cache[key] = build()
+        while len(_cache) > CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+    return _cache[key]
+
+
+def _panel_key(bulk: PricePanel) -> str:
+    """Content fingerprint of a panel (every OHLC cell), stable across processes."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(bulk.dates.asi8.tobytes())
+    digest.update("\0".join(bulk.tickers).encode())
+    digest.update(np.ascontiguousarray(bulk.values).data)
+    return digest.hexdigest()
+
+
+def _streaks(bulk: PricePanel, symbols: list[str], windows: tuple[int, ...]) -> dict:
+    """``sweep.streak_table`` limited to streaks some MA window can accept."""
+    table = sweep.streak_table(bulk, symbols, windows)
+    keep = np.flatnonzero(table["ok"] & np.logical_or.reduce(
+        [table["low"] < table["ma"][w] for w in windows]))
+    out = {name: table[name][keep] for name in ("sym", "row", "low", "high", "pct")}
+    out["ma"] = {w: table["ma"][w][keep] for w in windows}
+    return out
+
+
+def _trades(bulk: PricePanel, symbols: list[str], table: dict, first: int, stop: int):
+    """``(picked, outcomes)``: the streaks dated in rows ``[first, stop)`` and
+    their trades at the scan's rounded levels, simulated on those rows only."""
+    picked = np.flatnonzero((table["row"] >= first) & (table["row"] < stop))
+    return picked, backtest.simulate(
+        bulk.slice(first, stop), [s + ".NS" for s in symbols],
+        table["sym"][picked], table["row"][picked] - first,
+        np.round(table["low"][picked], 2), np.round(table["high"][picked], 2))
+
+
+def _shard_totals(bulk: PricePanel, key: tuple, symbols: list[str], lo: int, hi: int,
+                  windows: tuple[int, ...], jobs) -> list[np.ndarray]:
+    """``backtest.totals`` of symbols ``lo:hi`` per (stop, params) job."""
+    shard = symbols[lo:hi]
+    table = _cached(("streaks", key, tuple(shard), windows),
+                    lambda: _streaks(bulk, shard, windows))
+    out = []
+    for stop, params in jobs:
+        if not params:
+            out.append(np.empty((0, len(backtest.TOTALS))))
+            continue
+        first = max(stop - max((p[2] for p in params), default=0), 0)
+        picked, trades = _cached(("trades", key, tuple(shard), windows, first, stop),
+                                 lambda: _trades(bulk, shard, table, first, stop))
+        pct, low, row = table["pct"][picked], table["low"][picked], table["row"][picked]
+        tot = np.empty((len(params), len(backtest.TOTALS)))
+        for i, (threshold, window, lookback) in enumerate(params):
+            mask = ((pct >= threshold) & (low < table["ma"][window][picked])
+                    & (row >= stop - lookback))
+            chosen = {name: arr[mask] for name, arr in trades.items()}
+            tot[i] = backtest.totals(chosen, np.zeros(int(mask.sum()), dtype=np.intp), 1)[0]
+        out.append(tot)
+    return out
+
+
+def _run_shard(spec, dates, tickers, key, symbols, lo, hi, windows, jobs):
+    """Worker: ``_shard_totals`` on the shared panel."""
+    shm, values = strategy._from_shared(spec)
+    try:
+        return _shard_totals(PricePanel(dates, tickers, values), key,
+                             symbols, lo, hi, windows, jobs)
+    finally:
+        shm.close()
+
+
+def _combine(parts: list[np.ndarray]) -> np.ndarray:
+    tot = np.sum(parts, axis=0)
+    tot[:, -1] = np.min(parts, axis=0)[:, -1]   # drawdown combines by min
+    return tot
+
+
+def grid_totals(bulk: PricePanel, symbols: list[str], windows: tuple[int, ...],
+                jobs, workers: int | None = None) -> list[np.ndarray]:
+    """Universe-wide ``backtest.totals`` for each ``(stop, params)`` job.
+
+    ``params`` are ``(threshold, window, lookback)`` triples; a job trades
+    the signals dated in rows ``[stop - lookback, stop)`` on rows before
+    ``stop``. Shards and jobs run on the process pool when ``workers > 1``.
+    """
+    workers = workers or strategy.SCAN_WORKERS or os.cpu_count() or 1
+    key = _panel_key(bulk)
+    windows = tuple(sorted(set(windows)))
+    jobs = [(int(stop), list(params)) for stop, params in jobs]
+    bounds = np.linspace(0, len(symbols), min(workers, len(symbols)) + 1).astype(int)
+    shards = [(lo, hi) for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()) if hi > lo]
+    if not shards:
+        return [np.column_stack([np.zeros((len(p), 5)), np.full(len(p), np.inf)])
+                for _, p in jobs]
+    if workers <= 1:
+        parts = [_shard_totals(bulk, key, symbols, lo, hi, windows, jobs) for lo, hi in shards]
+    else:
+        shm, spec = strategy._to_shared(bulk.values)
+        try:
+            pool = strategy._get_pool(workers)
+            futures = [pool.submit(_run_shard, spec, bulk.dates, bulk.tickers, key,
+                                   symbols, lo, hi, windows, jobs) for lo, hi in shards]
+            parts = [fut.result() for fut in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+    return [_combine([part[j] for part in parts]) for j in range(len(jobs))]
+
+
+# ── Search ────────────────────────────────────────────────────────────
+def param_grid(thresholds, ma_windows, lookbacks, samples: int | None = None,
+               seed: int = 0) -> list[tuple]:
+    """Every (threshold, window, lookback) combination, or ``samples`` of
+    them drawn at random without replacement."""
+    grid = list(itertools.product([float(t) for t in thresholds],
+                                  [int(w) for w in ma_windows], [int(n) for n in lookbacks]))
+    if samples is not None and samples < len(grid):
+        pick = np.random.default_rng(seed).choice(len(grid), size=samples, replace=False)
+        grid = [grid[i] for i in sorted(pick.tolist())]
+    return grid
+
+
+def rank(rows: list[dict], metric: str = "avg_return_pct", min_trades: int = 1) -> list[dict]:
+    """Best first by ``metric``; sets with fewer than ``min_trades``
+    entries or no value for ``metric`` go last."""
+    def key(row):
+        value = row[metric]
+        usable = value is not None and row["entered"] >= min_trades
+        return (not usable, -(value if usable else 0))
+    return sorted(rows, key=key)
+
+
+def optimize(thresholds=(10, 15, 20, 25, 30), ma_windows=(50, 100, 200),
+             lookbacks=(125, 250, 500), bulk=None, symbols: list[str] | None = None,
+             stop: int | None = None, metric: str = "avg_return_pct",
+             min_trades: int = 10, samples: int | None = None, seed: int = 0,
+             workers: int | None = None) -> list[dict]:
+    """Backtest every parameter set up to row ``stop`` (default: the whole
+    panel) and rank them.
+
+    Rows are ``threshold``, ``ma_window`` and ``lookback`` plus the
+    ``backtest.metrics`` fields. Defaults to the live panel and
+    ``strategy.all_stocks``; ``samples`` switches to random search.
+    """
+    bulk = strategy._get_bulk() if bulk is None else bulk
+    symbols = strategy.all_stocks if symbols is None else list(symbols)
+    stop = len(bulk) if stop is None else stop
+    params = param_grid(thresholds, ma_windows, lookbacks, samples, seed)
+    tot, = grid_totals(bulk, symbols, ma_windows, [(stop, params)], workers)
+    rows = [dict(threshold=t, ma_window=w, lookback=n, **m)
+            for (t, w, n), m in zip(params, backtest.metrics(tot))]
+    return rank(rows, metric, min_trades)
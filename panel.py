@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+panel.py – Compact in-memory price panel
+PricePanel keeps only what the scanner reads: Open/High/Low/Close as one
+contiguous float32 block of shape (field, ticker, date), next to a date
+index and a ticker index. Compared with the provider's float64 frame of
+every field this is well under half the memory, and each ticker's series
+is contiguous per field.
+
+Providers still return the yfinance multi-ticker frame; it is converted
+once with ``PricePanel.from_frame`` right after a download.
+"""
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ('Open', 'High', 'Low', 'Close')
+DTYPE = np.float32
+
+
+class PricePanel:
+    """OHLC of many tickers: ``values[field, ticker, date]`` as float32.
+
+    A missing candle is NaN. Slicing by date returns views, never copies.
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, tickers: list[str], values: np.ndarray):
+        self.dates = pd.DatetimeIndex(dates, name='Date')
+        self.tickers = list(tickers)
+        self.values = values
+        self._pos = {t: j for j, t in enumerate(self.tickers)}
+
+    @classmethod
+    def from_frame(cls, bulk: pd.DataFrame) -> "PricePanel":
+        """Convert the provider's ``(ticker, field)`` frame; other fields are dropped."""
+        tickers = list(dict.fromkeys(bulk.columns.get_level_values(0))) if bulk.size else []
+        cube = bulk.reindex(columns=pd.MultiIndex.from_product([tickers, FIELDS]))
+        values = cube.to_numpy(dtype=DTYPE).reshape(len(bulk), len(tickers), len(FIELDS))
+        values = np.ascontiguousarray(values.transpose(2, 1, 0))
+        return cls(bulk.index if tickers else bulk.index[:0], tickers,
+                   values if tickers else np.empty((len(FIELDS), 0, 0), dtype=DTYPE))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._pos
+
+    @property
+    def empty(self) -> bool:
+        return not len(self.dates) or not self.tickers
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.dates.nbytes
+
+    def slice(self, start: int | None = None, stop: int | None = None) -> "PricePanel":
+        """Date rows ``start:stop`` as a view."""
+        rows = slice(start, stop)
+        return PricePanel(self.dates[rows], self.tickers, self.values[:, :, rows])
+
+    def since(self, date) -> "PricePanel":
+        """Rows dated on or after ``date``, as a view."""
+        return self.slice(int(self.dates.searchsorted(pd.Timestamp(date))))
+
+    def after(self, date) -> "PricePanel":
+        """Rows dated strictly after ``date``, as a view."""
+        return self.slice(int(self.dates.searchsorted(pd.Timestamp(date), side="right")))
+
+    def take(self, tickers: list[str]) -> np.ndarray:
+        """``(field, len(tickers), date)`` values; unknown tickers are all NaN.
+
+        Returns ``values`` itself when ``tickers`` is the panel's own list.
+        """
+        if list(tickers) == self.tickers:
+            return self.values
+        cols = np.array([self._pos.get(t, -1) for t in tickers], dtype=np.intp)
+        out = self.values[:, np.maximum(cols, 0), :]
+        out[:, cols < 0, :] = np.nan
+        return out
+
+    def series(self, ticker: str) -> np.ndarray | None:
+        """``(field, date)`` view of one ticker, or None if it is absent."""
+        j = self._pos.get(ticker)
+        return None if j is None else self.values[:, j, :]
+
+    def has_data(self, tickers: list[str]) -> np.ndarray:
+        """Per ticker: True if it has at least one close."""
+        return ~np.isnan(self.take(tickers)[FIELDS.index('Close')]).all(axis=1)
+
+    def merge(self, delta: "PricePanel") -> "PricePanel":
+        """Overlay ``delta`` on this panel; its non-NaN cells win.
+
+        Same semantics as ``delta.combine_first(bulk)`` on the frames.
+        """
+        dates = self.dates.union(delta.dates)
+        tickers = self.tickers + [t for t in delta.tickers if t not in self._pos]
+        values = np.full((len(FIELDS), len(tickers), len(dates)), np.nan, dtype=DTYPE)
+        values[:, :len(self.tickers), dates.get_indexer(self.dates)] = self.values
+
+        pos = {t: j for j, t in enumerate(tickers)}
+        cols = np.array([pos[t] for t in delta.tickers], dtype=np.intp)
+        rows = dates.get_indexer(delta.dates)
+        block = values[:, cols[:, None], rows]
+        values[:, cols[:, None], rows] = np.where(np.isnan(delta.values), block, delta.values)
+        return PricePanel(dates, tickers, values)
+
+    def equals(self, other: "PricePanel") -> bool:
+        return (self.tickers == other.tickers and self.dates.equals(other.dates)
+                and np.array_equal(self.values, other.values, equal_nan=True))
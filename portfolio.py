@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+portfolio.py – Portfolio simulation over the V20 signal stream
+Signals become trades with the backtest rules (enter when the low touches
+BuyAt, exit at SellAt, otherwise hold to the end). A capital account decides
+which ones are actually taken: positions are sized from cash and equity,
+capped at ``max_positions`` at once and one per symbol. Exits free their
+cash before the same day's entries.
+
+Trade outcomes come from ``backtest.simulate`` in blocks. Only the
+accept/reject pass over entries is sequential, and it is one heap
+operation per candidate. The equity curve is a cumulative sum of
+per-symbol share changes priced against forward-filled closes.
+
+    result = portfolio.simulate_portfolio(strategy.scan_stocks(), max_positions=10)
+    result["equity"]["Equity"], result["ledger"][:5], result["summary"]
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import strategy
+from panel import FIELDS
+
+SIZING = ("equal", "fraction", "fixed")
+
+
+def _ffill(closes: np.ndarray) -> np.ndarray:
+    """Last known close per (symbol, row); NaN before the first."""
+    valid = ~np.isnan(closes)
+    idx = np.where(valid, np.arange(closes.shape[1])[None, :], 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    out = np.take_along_axis(closes, idx, axis=1).astype(float)
+    out[np.cumsum(valid, axis=1) == 0] = np.nan
+    return out
+
+
+def _max_drawdown_pct(equity: np.ndarray) -> float:
+    peak = np.maximum.accumulate(equity)
+    return float(((equity - peak) / peak * 100).min()) if len(equity) else 0.0
+
+
+def simulate_portfolio(signals: list[dict] | None = None, bulk=None,
+                       capital: float = 1_000_000.0, max_positions: int = 10,
+                       sizing: str = "equal", size: float | None = None) -> dict:
+    """Trade scan result rows (``scan_stocks()`` format) through one account.
+
+    ``sizing`` sets the amount per position: ``"equal"`` is equity /
+    ``max_positions``, ``"fraction"`` is ``size`` x equity, and ``"fixed"``
+    is ``size`` currency units. Equity is marked at the previous close.
+    Whole shares only, never more than the cash on hand. Same-day entries
+    go oldest signal first. Returns ``equity`` (a frame of Cash, Holdings,
+    Equity and Positions per panel date), ``ledger`` (one row per trade
+    taken) and ``summary``.
+    """
+    if sizing not in SIZING:
+        raise ValueError(f"sizing must be one of {SIZING}, got {sizing!r}")
+    if sizing != "equal" and size is None:
+        raise ValueError(f"sizing={sizing!r} needs a size")
+    bulk = strategy._get_bulk() if bulk is None else bulk
+    signals = strategy.scan_stocks() if signals is None else signals
+
+    symbols = list(dict.fromkeys(row['Symbol'] for row in signals))
+    index = {s: j for j, s in enumerate(symbols)}
+    tickers = [s + ".NS" for s in symbols]
+    sym = np.array([index[row['Symbol']] for row in signals], dtype=np.intp)
+    signal_row = bulk.dates.get_indexer(pd.DatetimeIndex([row['SignalDate'] for row in signals]))
+    buy = np.array([row['BuyAt'] for row in signals], dtype=float)
+    sell = np.array([row['SellAt'] for row in signals], dtype=float)
+    trades = backtest.simulate(bulk, tickers, sym, signal_row, buy, sell)
+    closes = _ffill(bulk.take(tickers)[FIELDS.index('Close')])
+    n_rows = len(bulk)
+
+    # ── Accept/reject pass, in entry order ───────────────────────────
+    entered = np.flatnonzero(trades["entered"])
+    order = entered[np.lexsort((entered, signal_row[entered], trades["entry_row"][entered]))]
+    cash, held, exits = float(capital), set(), []   # exits: heap of (row, trade, shares)
+    open_pos = {}                                   # trade -> shares
+    taken, shares_taken = [], []
+    skipped = {"max_positions": 0, "symbol_held": 0, "cash": 0}
+    for i in order.tolist():
+        row = int(trades["entry_row"][i])
+        while exits and exits[0][0] <= row:
+            _, k, qty = heapq.heappop(exits)
+            cash += qty * sell[k]
+            held.discard(sym[k])
+            del open_pos[k]
+        if len(open_pos) >= max_positions:
+            skipped["max_positions"] += 1
+            continue
+        if sym[i] in held:
+            skipped["symbol_held"] += 1
+            continue
+        if sizing == "fixed":
+            amount = size
+        else:
+            marks = [qty * closes[sym[k], row - 1] for k, qty in open_pos.items()]
+            equity = cash + float(np.nansum(marks)) if marks else cash
+            amount = equity / max_positions if sizing == "equal" else size * equity
+        qty = np.floor(min(amount, cash) / buy[i])
+        if qty <= 0:
+            skipped["cash"] += 1
+            continue
+        cash -= qty * buy[i]
+        held.add(sym[i])
+        open_pos[i] = qty
+        taken.append(i)
+        shares_taken.append(qty)
+        if trades["hit"][i]:
+            heapq.heappush(exits, (int(trades["exit_row"][i]), i, qty))
+
+    # ── Equity curve ─────────────────────────────────────────────────
+    taken = np.array(taken, dtype=np.intp)
+    qty = np.array(shares_taken, dtype=float)
+    hit = trades["hit"][taken]
+    entry, exit_ = trades["entry_row"][taken], trades["exit_row"][taken]
+    cash_flow = np.zeros(n_rows + 1)
+    np.add.at(cash_flow, entry, -qty * buy[taken])
+    np.add.at(cash_flow, exit_[hit], qty[hit] * sell[taken][hit])
+    cash_curve = capital + np.cumsum(cash_flow[:-1])
+
+    shares = np.zeros((len(symbols), n_rows + 1))
+    np.add.at(shares, (sym[taken], entry), qty)
+    np.add.at(shares, (sym[taken][hit], exit_[hit]), -qty[hit])
+    shares = np.cumsum(shares[:, :-1], axis=1)
+    holdings = np.nansum(np.where(shares > 0, shares * closes, 0.0), axis=0)
+    positions = np.zeros(n_rows + 1, dtype=np.int64)
+    np.add.at(positions, entry, 1)
+    np.add.at(positions, exit_[hit], -1)
+    equity = pd.DataFrame({"Cash": cash_curve, "Holdings": holdings,
+                           "Equity": cash_curve + holdings,
+                           "Positions": np.cumsum(positions[:-1])}, index=bulk.dates)
+
+    # ── Ledger ───────────────────────────────────────────────────────
+    dates = [str(d.date()) for d in bulk.dates]
+    last_mark = closes[sym[taken], -1] if n_rows else np.full(len(taken), np.nan)
+    exit_price = np.where(hit, sell[taken], last_mark)
+    pnl = qty * (exit_price - buy[taken])
+    ret = (exit_price - buy[taken]) / buy[taken] * 100
+    ledger = [
+        {"Symbol": symbols[s], "SignalDate": signals[i]['SignalDate'],
+         "EntryDate": dates[e], "ExitDate": dates[x] if h else None,
+         "Shares": int(q), "EntryPrice": round(b, 2), "ExitPrice": round(p, 2),
+         "PnL": round(v, 2), "Return%": round(r, 2), "Open": not h}
+        for i, s, e, x, h, q, b, p, v, r in zip(
+            taken.tolist(), sym[taken].tolist(), entry.tolist(), exit_.tolist(),
+            hit.tolist(), qty.tolist(), buy[taken].tolist(), exit_price.tolist(),
+            pnl.tolist(), ret.tolist())
+    ]
+
+    curve = equity["Equity"].to_numpy()
+    final = float(curve[-1]) if n_rows else float(capital)
+    summary = {
+        "capital": float(capital), "final_equity": round(final, 2),
+        "total_return_pct": round((final / capital - 1) * 100, 2),
+        "max_drawdown_pct": round(_max_drawdown_pct(curve), 2),
+        "signals": len(signals), "entered": len(entered), "taken": len(taken),
+        "closed": int(hit.sum()), "open": int((~hit).sum()),
+        "win_rate": round(float((pnl > 0).mean()), 4) if len(taken) else None,
+        "skipped": skipped,
+    }
+    return {"equity": equity, "ledger": ledger, "summary": summary}
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+providers.py – Market-data backends
+Every provider returns the same shape ``yf.download(group_by="ticker")``
+does: a DatetimeIndex of trading days and (ticker, field) columns.
+
+Pick one with the V20_PROVIDER environment variable:
+    yfinance            live download (default)
+    local:<dir>         <dir>/<TICKER>.csv or .parquet, one file per ticker
+    synthetic[:<seed>]  deterministic random-walk OHLC, no network needed
+
+``download_chunked`` wraps any of them: tickers are fetched in chunks on a
+bounded thread pool, and chunks or tickers that fail are retried.
+"""
+
+import logging
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _assemble(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Join per-ticker frames into the yfinance multi-ticker layout."""
+    if not frames:
+        return pd.DataFrame(columns=pd.MultiIndex.from_arrays([[], []],
+                                                              names=['Ticker', 'Price']))
+    bulk = pd.concat(frames, axis=1).sort_index()
+    bulk.columns.names = ['Ticker', 'Price']
+    bulk.index.name = 'Date'
+    return bulk
+
+
+class YFinanceProvider:
+    """Live data from Yahoo Finance in a single batched request.
+
+    ``download_chunked`` calls this from several threads at once; that
+    needs yfinance 1.0 or later (0.2.x shares download state module-wide
+    and concurrent calls drop each other's tickers), see requirements.txt.
+    """
+
+    def download(self, tickers: list[str], start: str, end: str) -> pd.DataFrame:
+        import yfinance as yf
+
+        return yf.download(
+            tickers=tickers,
+            start=start,
+            end=end,
+            group_by="ticker",
+            threads=False
+        )
+
+
+class LocalProvider:
+    """OHLC read from one CSV or Parquet file per ticker in ``directory``.
+
+    Files need a ``Date`` column (or index) plus Open/High/Low/Close;
+    tickers without a file are simply absent from the result.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _read(self, ticker: str) -> pd.DataFrame | None:
+        base = os.path.join(self.directory, ticker)
+        if os.path.exists(base + ".parquet"):
+            df = pd.read_parquet(base + ".parquet")
+        elif os.path.exists(base + ".csv"):
+            df = pd.read_csv(base + ".csv")
+        else:
+            return None
+        if 'Date' in df.columns:
+            df = df.set_index('Date')
+        df.index = pd.to_datetime(df.index)
+        return df[[f for f in FIELDS if f in df.columns]]
+
+    def download(self, tickers: list[str], start: str, end: str) -> pd.DataFrame:
+        lo, hi = pd.Timestamp(start), pd.Timestamp(end)
+        frames = {}
+        for ticker in tickers:
+            df = self._read(ticker)
+            if df is not None:
+                frames[ticker] = df.loc[(df.index >= lo) & (df.index < hi)]
+        return _assemble(frames)
+
+
+class SyntheticProvider:
+    """Seeded random-walk OHLC for offline runs, CI and benchmarks.
+
+    Prices for a given (seed, ticker, day) never depend on the requested
+    window, so incremental refreshes line up with earlier downloads.
+    ``rally_prob`` is the per-day chance that a 4-11 day run of green
+    candles starts, which controls how many V20 streaks the data holds.
+    """
+
+    EPOCH = "2015-01-01"
+
+    def __init__(self, seed: int = 0, rally_prob: float = 0.0, epoch: str = EPOCH):
+        self.seed = seed
+        self.rally_prob = rally_prob
+        self.epoch = epoch
+
+    def _series(self, ticker: str, dates: pd.DatetimeIndex) -> pd.DataFrame:
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+        n = len(dates)
+        base = rng.uniform(50, 2000)
+        returns = rng.normal(0, 0.02, n)
+        gaps = rng.normal(0, 0.012, n)
+        high_wick = rng.uniform(0, 0.015, n)
+        low_wick = rng.uniform(0, 0.015, n)
+        volume = rng.integers(10_000, 2_000_000, n).astype(float)
+
+        if self.rally_prob > 0:
+            rally = np.zeros(n, dtype=bool)
+            for start in np.flatnonzero(rng.random(n) < self.rally_prob):
+                rally[start:start + rng.integers(4, 12)] = True
+            returns[rally] = np.abs(returns[rally]) + 0.03
+            gaps[rally] = -np.abs(gaps[rally]) - 0.005  # open below close
+
+        close = base * np.exp(np.cumsum(returns))
+        opens = close * np.exp(gaps)
+        highs = np.maximum(opens, close) * (1 + high_wick)
+        lows = np.minimum(opens, close) * (1 - low_wick)
+        return pd.DataFrame(
+            {'Open': opens, 'High': highs, 'Low': lows, 'Close': close, 'Volume': volume},
+            index=dates,
+        )
+
+    def download(self, tickers: list[str], start: str, end: str) -> pd.DataFrame:
+        dates = pd.bdate_range(self.epoch, end, inclusive="left", name="Date")
+        keep = dates >= pd.Timestamp(start)
+        return _assemble({t: self._series(t, dates)[keep] for t in tickers})
+
+
+def _with_data(bulk: pd.DataFrame, tickers: list[str]) -> dict[str, pd.DataFrame]:
+    """Per-ticker frames of ``bulk`` for tickers that have at least one close."""
+    present = set(bulk.columns.get_level_values(0)) if bulk.size else set()
+    frames = {}
+    for ticker in tickers:
+        if ticker in present:
+            df = bulk[ticker]
+            if 'Close' in df and df['Close'].notna().any():
+                frames[ticker] = df
+    return frames
+
+
+def download_chunked(provider, tickers: list[str], start: str, end: str,
+                     chunk_size: int = 50, workers: int = 4, retries: int = 2,
+                     backoff: float = 2.0) -> tuple[pd.DataFrame, list[str]]:
+    """Download ``tickers`` chunk by chunk on at most ``workers`` threads.
+
+    A chunk that raises, and every ticker that comes back without a close,
+    is retried up to ``retries`` times, waiting ``backoff * 2**n`` seconds
+    before retry ``n``. Returns ``(bulk, failed)``: the assembled frame in
+    ``tickers`` order and the tickers still missing after the last attempt.
+    """
+    frames = {}
+    pending = list(tickers)
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff * 2 ** (attempt - 1)
+            log.warning("Retrying %d tickers in %.1fs (attempt %d of %d)",
+                        len(pending), delay, attempt + 1, retries + 1)
+            time.sleep(delay)
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+            futures = [(chunk, pool.submit(provider.download, chunk, start, end))
+                       for chunk in chunks]
+            for chunk, future in futures:
+                try:
+                    frames.update(_with_data(future.result(), chunk))
+                except Exception as exc:
+                    log.warning("Chunk of %d tickers (%s..) failed: %s",
+                                len(chunk), chunk[0], exc)
+        pending = [t for t in pending if t not in frames]
+        if not pending:
+            break
+    return _assemble({t: frames[t] for t in tickers if t in frames}), pending
+
+
+def get_provider(spec: str):
+    """Build a provider from a ``V20_PROVIDER``-style spec string."""
+    name, _, arg = spec.partition(":")
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "local":
+        return LocalProvider(arg or "data/ohlc")
+    if name == "synthetic":
+        return SyntheticProvider(int(arg or 0))
+    raise ValueError(f"Unknown market-data provider: {spec!r}")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+store.py – On-disk price panel
+Keeps the PricePanel as a raw NumPy ``.npy`` block plus a small JSON
+sidecar, so a restarted worker can memory-map it back in milliseconds
+instead of re-downloading from the network.
+
+Layout of the store directory:
+    panel-<token>.npy    float32 values, shape (field, ticker, date)
+    panel-<token>.json   dates (ISO) and tickers
+    panel-<token>.ma<w>.npy  float32 moving averages, shape (ticker, date)
+    current.json         pointer to the live token + window metadata
+    state-<lineage>.npz  incremental scan state for that price history
+    refresh.lock         flock()ed by whichever process is downloading
+
+Because every process memory-maps the same files, gunicorn workers share
+one copy of the panel and its moving averages through the page cache.
+"""
+
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from panel import PricePanel
+
+CURRENT = "current.json"
+LOCK = "refresh.lock"
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        write(fh)
+    os.replace(tmp, path)
+
+
+def save_panel(bulk: PricePanel, directory: str, means: dict | None = None, **meta) -> str:
+    """Persist ``bulk`` under a new token and point ``current.json`` at it.
+
+    ``means`` maps MA windows to ``(ticker, date)`` arrays saved alongside.
+    Extra keyword arguments (e.g. ``start``/``end``) are stored as metadata.
+    Returns the token. Files of previous tokens are removed afterwards.
+    """
+    os.makedirs(directory, exist_ok=True)
+    token = f"{time.time_ns():x}"
+    base = os.path.join(directory, f"panel-{token}")
+
+    values = np.ascontiguousarray(bulk.values)
+    _write_atomic(base + ".npy", lambda fh: np.save(fh, values))
+    for w, ma in (means or {}).items():
+        _write_atomic(f"{base}.ma{w}.npy", lambda fh: np.save(fh, np.asarray(ma)))
+    labels = {
+        "dates": [ts.isoformat() for ts in bulk.dates],
+        "tickers": bulk.tickers,
+    }
+    _write_atomic(base + ".json", lambda fh: fh.write(json.dumps(labels).encode()))
+
+    pointer = dict(meta, token=token, saved_at=time.time())
+    _write_atomic(os.path.join(directory, CURRENT),
+                  lambda fh: fh.write(json.dumps(pointer).encode()))
+
+    for name in os.listdir(directory):
+        if name.startswith("panel-") and token not in name:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass  # another process may be cleaning up too
+    return token
+
+
+def read_pointer(directory: str) -> dict | None:
+    """Metadata of the live snapshot (token, saved_at, ...), if any."""
+    try:
+        with open(os.path.join(directory, CURRENT)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def pointer_mtime(directory: str) -> int | None:
+    """Cheap change detector for ``current.json``."""
+    try:
+        return os.stat(os.path.join(directory, CURRENT)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def touch(directory: str) -> None:
+    """Mark the live snapshot as re-validated without rewriting the data."""
+    pointer = read_pointer(directory)
+    if pointer is not None:
+        pointer["saved_at"] = time.time()
+        _write_atomic(os.path.join(directory, CURRENT),
+                      lambda fh: fh.write(json.dumps(pointer).encode()))
+
+
+@contextmanager
+def lock(directory: str, blocking: bool = True):
+    """Inter-process refresh lock; yields False if not blocking and busy."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK), "a") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def load_panel(directory: str) -> tuple[PricePanel, dict] | None:
+    """Return ``(bulk, meta)`` from the store, or ``None`` if there is none.
+
+    Values are memory-mapped read-only, so loading is O(metadata).
+    Snapshots in an older layout are treated as absent.
+    """
+    meta = read_pointer(directory)
+    if meta is None:
+        return None
+    try:
+        base = os.path.join(directory, f"panel-{meta['token']}")
+        with open(base + ".json") as fh:
+            labels = json.load(fh)
+        values = np.load(base + ".npy", mmap_mode="r")
+        dates, tickers = pd.DatetimeIndex(labels["dates"]), labels["tickers"]
+    except (OSError, ValueError, KeyError):
+        return None
+    if values.shape != (4, len(tickers), len(dates)):
+        return None
+    return PricePanel(dates, tickers, values), meta
+
+
+def load_means(directory: str, token: str, windows, shape: tuple) -> dict | None:
+    """Memory-mapped moving averages saved with snapshot ``token``, or None
+    if any of ``windows`` is missing or not of ``shape``."""
+    means = {}
+    for w in windows:
+        try:
+            ma = np.load(os.path.join(directory, f"panel-{token}.ma{w}.npy"), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if ma.shape != shape:
+            return None
+        means[w] = ma
+    return means
+
+
+def save_state(directory: str, lineage: str, arrays: dict) -> None:
+    """Persist scan state arrays for ``lineage``; other lineages are removed."""
+    os.makedirs(directory, exist_ok=True)
+    name = f"state-{lineage}.npz"
+    _write_atomic(os.path.join(directory, name), lambda fh: np.savez(fh, **arrays))
+    for other in os.listdir(directory):
+        if other.startswith("state-") and other != name and ".tmp-" not in other:
+            try:
+                os.remove(os.path.join(directory, other))
+            except OSError:
+                pass
+
+
+def load_state(directory: str, lineage: str) -> dict | None:
+    """Scan state arrays saved for ``lineage``, or None."""
+    try:
+        with np.load(os.path.join(directory, f"state-{lineage}.npz"),
+                     allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+        return None
@@ -1,19 +1,72 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-strategy.py – Lazy batched yfinance download
+strategy.py – Lazy batched market-data download
 Downloads all tickers in a single request the first time the
 web page is hit, then re‑uses the data for faster responses.
+After REFRESH_SECONDS the data is re-downloaded in a background
+thread while requests keep being served from the previous snapshot.
+Every download is also written to STORE_DIR, which a restarted worker
+loads from before falling back to the network. Workers sharing a
+STORE_DIR memory-map the same snapshot and take turns downloading.
 """
 
-import yfinance as yf
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import metrics
+import providers
+import store
+from incremental import RollingMeans, ScanState
+from panel import DTYPE, FIELDS, PricePanel
+
+log = logging.getLogger(__name__)
 
 # ── CONFIG ────────────────────────────────────────────────────────────
 THRESHOLD_PERCENT = 20
-START_DATE = (datetime.today() - timedelta(days=3 * 365)).strftime('%Y-%m-%d')
-END_DATE   = datetime.today().strftime('%Y-%m-%d')
+LOOKBACK_DAYS = 3 * 365
+# Moving averages kept with the price panel, e.g. V20_MA_WINDOWS="50,200";
+# MA200 drives the scan and is always included
+MA_WINDOWS = tuple(sorted({200, *(int(w) for w in
+                                  os.environ.get("V20_MA_WINDOWS", "200").split(",") if w)}))
+REFRESH_SECONDS = int(os.environ.get("V20_REFRESH_SECONDS", 6 * 3600))
+RETRY_SECONDS = int(os.environ.get("V20_RETRY_SECONDS", 5 * 60))
+# Worker processes for the panel scan; 0 or 1 keeps it in-process
+SCAN_WORKERS = int(os.environ.get("V20_SCAN_WORKERS", 0))
+# Advance persisted streak state instead of rescanning all history
+INCREMENTAL_SCAN = os.environ.get("V20_INCREMENTAL", "1") != "0"
+# Market-data backend, see providers.py (e.g. "synthetic" to run offline)
+PROVIDER = providers.get_provider(os.environ.get("V20_PROVIDER", "yfinance"))
+# Download pipeline: tickers per request, concurrent requests, retries and
+# the first retry delay in seconds (doubling after that)
+DOWNLOAD_CHUNK = int(os.environ.get("V20_DOWNLOAD_CHUNK", 50))
+DOWNLOAD_WORKERS = int(os.environ.get("V20_DOWNLOAD_WORKERS", 4))
+DOWNLOAD_RETRIES = int(os.environ.get("V20_DOWNLOAD_RETRIES", 2))
+DOWNLOAD_BACKOFF = float(os.environ.get("V20_DOWNLOAD_BACKOFF", 2.0))
+# On-disk price store; set V20_STORE_DIR="" to disable
+STORE_DIR = os.environ.get(
+    "V20_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+
+
+def _date_window() -> tuple[str, str]:
+    today = datetime.today()
+    return ((today - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d'),
+            today.strftime('%Y-%m-%d'))
+
+
+START_DATE, END_DATE = _date_window()
 
 # Full NSE ticker list (191 symbols)
 all_stocks = [
@@ -43,90 +96,1199 @@ all_stocks = [
 ]
 
 # ── Lazy bulk download cache ──────────────────────────────────────────
-_bulk_cache = None
+class Snapshot(NamedTuple):
+    """The price data being served, published as a whole by ``_set_bulk``.
 
+    Readers take one snapshot and derive everything (cache keys, views,
+    scan state) from it, so a refresh landing mid-request never mixes the
+    data of one download with the version or lineage of another.
+    """
+    bulk: PricePanel
+    version: int            # unique per snapshot, keys every derived cache
+    lineage: str            # changes on every full download, kept by deltas
+    token: str | None       # store token behind ``bulk``, if memory-mapped
+    means: dict             # stored moving averages, see _moving_averages
 
-def _bulk_download() -> pd.DataFrame:
-    """Download all tickers in one call (only once per runtime)."""
+
+_snapshot = None
+_versions = itertools.count(1)
+_bulk_loaded_at = None      # wall-clock time of the current snapshot
+_next_refresh_at = 0.0      # time.monotonic() deadline for the next refresh
+_store_mtime = None         # last seen mtime of the store pointer
+_load_lock = threading.Lock()
+_download_stats = {"seconds": None, "finished_at": None, "kind": None, "failed": []}
+
+
+def _bulk_download(start: str | None = None, end: str | None = None,
+                   catch_up: tuple[list[str], str] | None = None) -> PricePanel:
+    """Download all tickers from the configured provider, in parallel chunks.
+
+    ``catch_up`` is ``(symbols, since)``: those symbols are fetched from
+    the earlier ``since`` instead of ``start``. Symbols still missing after
+    the retries are logged and listed in ``cache_stats()``; if every
+    symbol failed, RuntimeError is raised so the previous snapshot stays
+    in service.
+    """
     tickers = [s + ".NS" for s in all_stocks]
-    return yf.download(
-        tickers=tickers,
-        start=START_DATE,
-        end=END_DATE,
-        group_by="ticker",
-        threads=False
-    )
+    lagging, since = catch_up or ([], None)
+    late = {s + ".NS" for s in lagging}
+    groups = [([t for t in tickers if t not in late], start or START_DATE),
+              ([t for t in tickers if t in late], since)]
+    t0 = time.perf_counter()
+    frames, failed = [], []
+    for group, group_start in groups:
+        if group:
+            frame, group_failed = providers.download_chunked(
+                PROVIDER, group, group_start, end or END_DATE,
+                chunk_size=DOWNLOAD_CHUNK, workers=DOWNLOAD_WORKERS,
+                retries=DOWNLOAD_RETRIES, backoff=DOWNLOAD_BACKOFF,
+            )
+            frames.append(frame)
+            failed += group_failed
+    elapsed = time.perf_counter() - t0
+    failed = [t.removesuffix(".NS") for t in failed]
+    _download_stats.update(seconds=elapsed, finished_at=time.time(), failed=failed)
+    metrics.STAGE_SECONDS.labels(stage="download").observe(elapsed)
+    metrics.FAILED_SYMBOLS.inc(len(failed))
+    if failed:
+        log.warning("No data for %d of %d symbols: %s", len(failed), len(tickers),
+                    ", ".join(failed))
+    if tickers and len(failed) == len(tickers):
+        raise RuntimeError(f"Download returned no data for any of {len(tickers)} symbols")
+    frames = [f for f in frames if f.size]
+    if len(frames) > 1:
+        return PricePanel.from_frame(pd.concat(frames, axis=1))
+    return PricePanel.from_frame(frames[0] if frames else providers._assemble({}))
+
+
+def _schedule_refresh(loaded_at: float) -> None:
+    global _bulk_loaded_at, _next_refresh_at
+    _bulk_loaded_at = loaded_at
+    age = time.time() - loaded_at
+    _next_refresh_at = time.monotonic() + max(0.0, REFRESH_SECONDS - age)
+
+
+def _retry_later() -> None:
+    global _next_refresh_at
+    _next_refresh_at = time.monotonic() + RETRY_SECONDS
+
+
+def _set_bulk(bulk: PricePanel, loaded_at: float | None = None,
+              token: str | None = None, lineage: str | None = None,
+              means: dict | None = None) -> None:
+    """Swap in a new snapshot; ``loaded_at`` is when its data was fetched.
+
+    ``lineage`` should only be passed when ``bulk`` extends the previous
+    history (delta refresh); otherwise a fresh one is minted. ``means`` are
+    its stored moving averages, if already known.
+    """
+    global _snapshot
+    means = _moving_averages(bulk) if means is None else means
+    _snapshot = Snapshot(bulk, next(_versions), lineage or f"{time.time_ns():x}", token, means)
+    _schedule_refresh(time.time() if loaded_at is None else loaded_at)
+
+
+def _load_from_store() -> bool:
+    """Adopt the on-disk snapshot, if any. Returns True on success."""
+    global START_DATE, END_DATE
+    if not STORE_DIR:
+        return False
+    loaded = store.load_panel(STORE_DIR)
+    if loaded is None:
+        return False
+    bulk, meta = loaded
+    START_DATE, END_DATE = meta.get("start", START_DATE), meta.get("end", END_DATE)
+    means = store.load_means(STORE_DIR, meta["token"], MA_WINDOWS,
+                             (len(bulk.tickers), len(bulk)))
+    _set_bulk(bulk, loaded_at=meta.get("saved_at"), token=meta["token"],
+              lineage=meta.get("lineage"), means=means)
+    return True
+
+
+def _save_to_store(bulk: PricePanel, lineage: str, means: dict) -> bool:
+    if not STORE_DIR:
+        return False
+    try:
+        store.save_panel(bulk, STORE_DIR, means=means,
+                         start=START_DATE, end=END_DATE, lineage=lineage)
+    except OSError:
+        log.exception("Could not write price store to %s", STORE_DIR)
+        return False
+    return True
+
+
+def _sync_from_store() -> None:
+    """Adopt a snapshot another worker has published since we last looked.
+
+    Costs one ``stat()`` per call unless the store pointer has changed.
+    """
+    global _store_mtime
+    mtime = store.pointer_mtime(STORE_DIR)
+    if mtime is None or mtime == _store_mtime:
+        return
+    if not _load_lock.acquire(blocking=False):
+        return  # this worker is refreshing; it will adopt the result itself
+    try:
+        _store_mtime = mtime
+        meta = store.read_pointer(STORE_DIR)
+        if meta is None:
+            return
+        snap = _snapshot
+        if snap is None or meta["token"] != snap.token:
+            _load_from_store()
+        else:
+            _schedule_refresh(meta["saved_at"])  # re-validated elsewhere
+    finally:
+        _load_lock.release()
+
+
+def _merge_delta(bulk: PricePanel, delta: PricePanel, start: str) -> PricePanel:
+    """Overlay freshly downloaded rows on ``bulk`` and drop rows before ``start``.
+
+    The last cached candle is re-fetched as part of ``delta`` (it may have
+    been a partial day), so delta values win wherever they are present.
+    """
+    merged = bulk if delta.empty else bulk.merge(delta)
+    return merged.since(start)
+
+
+def _can_extend(bulk: PricePanel | None, start: str) -> bool:
+    """True if ``bulk`` covers every ticker and still overlaps the window."""
+    if bulk is None or bulk.empty:
+        return False
+    return (all(s + ".NS" in bulk for s in all_stocks)
+            and bulk.dates[-1] >= pd.Timestamp(start))
+
+
+def _lagging(bulk: PricePanel, start: str) -> tuple[list[str], str] | None:
+    """Symbols whose last close is older than the panel's last date (a
+    failed earlier delta), and the earliest of those closes; None if all
+    are current. Symbols with no close at all date back to ``start``."""
+    closes = bulk.take([s + ".NS" for s in all_stocks])[FIELDS.index('Close')]
+    has = ~np.isnan(closes)
+    last = np.where(has.any(axis=1), len(bulk) - 1 - np.argmax(has[:, ::-1], axis=1), -1)
+    behind = np.flatnonzero(last < len(bulk) - 1)
+    if not behind.size:
+        return None
+    first = last[behind].min()
+    since = bulk.dates[first].strftime('%Y-%m-%d') if first >= 0 else start
+    return [all_stocks[j] for j in behind], since
+
+
+def _backfilled(delta: PricePanel, symbols: list[str], last) -> bool:
+    """True if ``delta`` has a close for ``symbols`` dated before ``last``."""
+    older = delta.slice(None, int(delta.dates.searchsorted(last)))
+    return bool(older.has_data([s + ".NS" for s in symbols]).any())
+
+
+def _download_bulk() -> None:
+    """Bring the cache up to a freshly computed date window and swap it in.
+
+    With a usable cache only the candles since the last cached date are
+    downloaded, plus the history each lagging symbol missed since its own
+    last close; otherwise the full window is fetched. The result is
+    published to the store and re-attached from there, so this worker
+    holds the shared memory-mapped copy rather than a private one.
+    """
+    global START_DATE, END_DATE
+    start, end = _date_window()
+    snap = _snapshot
+    bulk = None if snap is None else snap.bulk
+    lineage = None
+    if _can_extend(bulk, start):
+        lineage = snap.lineage
+        catch_up = _lagging(bulk, start)
+        delta = _bulk_download(bulk.dates[-1].strftime('%Y-%m-%d'), end, catch_up)
+        _download_stats["kind"] = "delta"
+        if catch_up and _backfilled(delta, catch_up[0], bulk.dates[-1]):
+            lineage = None  # committed rows changed: incremental state must rebuild
+        merged = _merge_delta(bulk, delta, start)
+        if merged.equals(bulk):
+            START_DATE, END_DATE = start, end
+            _schedule_refresh(time.time())
+            if STORE_DIR:
+                store.touch(STORE_DIR)
+            return
+        bulk = merged
+    else:
+        bulk = _bulk_download(start, end)
+        _download_stats["kind"] = "full"
+    START_DATE, END_DATE = start, end
+    # A kept lineage means only rows from the old last candle on changed
+    means = _moving_averages(bulk, snap if lineage else None)
+    lineage = lineage or f"{time.time_ns():x}"
+    if not (_save_to_store(bulk, lineage, means) and _load_from_store()):
+        _set_bulk(bulk, lineage=lineage, means=means)
+
+
+def _refresh_bulk(blocking: bool = True) -> None:
+    """Refresh the cache, downloading in at most one worker per store.
+
+    A worker that loses the race for the store lock either waits and then
+    adopts the winner's snapshot (``blocking``) or returns immediately and
+    picks it up later through ``_sync_from_store``.
+    """
+    if not STORE_DIR:
+        _download_bulk()
+        return
+    with store.lock(STORE_DIR, blocking=blocking) as acquired:
+        if not acquired:
+            _retry_later()
+            return
+        meta = store.read_pointer(STORE_DIR)
+        if meta and time.time() - meta["saved_at"] < REFRESH_SECONDS:
+            # Another worker refreshed while we were waiting
+            snap = _snapshot
+            if (snap is None or meta["token"] != snap.token) and _load_from_store():
+                return
+            if snap is not None:
+                _schedule_refresh(meta["saved_at"])
+                return
+        _download_bulk()
+
+
+def _background_refresh() -> None:
+    """Runs in its own thread; the caller already holds ``_load_lock``."""
+    try:
+        _refresh_bulk(blocking=False)
+    except Exception:
+        log.exception("Background bulk refresh failed; keeping previous snapshot")
+        _retry_later()
+    finally:
+        _load_lock.release()
+
+
+def _start_background_refresh() -> None:
+    if not _load_lock.acquire(blocking=False):
+        return  # a download is already in flight
+    threading.Thread(target=_background_refresh, name="bulk-refresh",
+                     daemon=True).start()
+
+
+def _get_snapshot() -> Snapshot:
+    if _snapshot is None:
+        # Cold start: nothing to serve yet, so this one request waits
+        # (on local disk if a store exists, else on the network)
+        with _load_lock:
+            if _snapshot is None and not _load_from_store():
+                _refresh_bulk()
+        return _snapshot
+
+    if STORE_DIR:
+        _sync_from_store()
+    if time.monotonic() >= _next_refresh_at:
+        _start_background_refresh()
+    return _snapshot
+
+
+def _get_bulk() -> PricePanel:
+    return _get_snapshot().bulk
+
 
+# ── Metrics gauges (evaluated at scrape time) ──────────────────────────
+def _price_cache_bytes() -> float:
+    snap = _snapshot
+    return 0 if snap is None else snap.bulk.nbytes
 
-def _get_bulk() -> pd.DataFrame:
-    global _bulk_cache
-    if _bulk_cache is None:
-        _bulk_cache = _bulk_download()
-    return _bulk_cache
+
+metrics.PRICE_CACHE_BYTES.set_function(_price_cache_bytes)
+metrics.DATA_AGE_SECONDS.set_function(
+    lambda: float("nan") if _bulk_loaded_at is None else time.time() - _bulk_loaded_at
+)
+
+
+# ── Background warm-up ────────────────────────────────────────────────
+_warmup = {"thread": None, "error": None, "failed_at": None}
+_warmup_lock = threading.Lock()
+
+
+def _warm() -> None:
+    try:
+        _scan_entry()
+        _warmup.update(error=None, failed_at=None)
+    except Exception as exc:
+        log.exception("Warm-up failed")
+        _warmup.update(error=f"{type(exc).__name__}: {exc}", failed_at=time.monotonic())
+
+
+def warm_up() -> None:
+    """Load the price data and run the first scan in a background thread.
+
+    Safe to call repeatedly: does nothing while a warm-up is running or once
+    the app is ready, and retries a failed attempt after ``RETRY_SECONDS``.
+    """
+    with _warmup_lock:
+        thread = _warmup["thread"]
+        if is_ready() or (thread is not None and thread.is_alive()):
+            return
+        failed_at = _warmup["failed_at"]
+        if failed_at is not None and time.monotonic() - failed_at < RETRY_SECONDS:
+            return
+        thread = threading.Thread(target=_warm, name="warm-up", daemon=True)
+        _warmup["thread"] = thread
+        thread.start()
+
+
+def is_ready() -> bool:
+    """True once price data is loaded and at least one scan is cached."""
+    return _snapshot is not None and _scan_cache["key"] is not None
+
+
+_symbol_count = {"version": None, "count": 0}
+
+
+def _loaded_symbols(snap: Snapshot) -> int:
+    """Symbols with at least one close in ``snap`` (memoized)."""
+    if _symbol_count["version"] != snap.version:
+        tickers = [s + ".NS" for s in all_stocks]
+        _symbol_count.update(version=snap.version, count=int(snap.bulk.has_data(tickers).sum()))
+    return _symbol_count["count"]
+
+
+def cache_stats() -> dict:
+    """Freshness and timing of the price cache and the latest scan."""
+    now = time.time()
+    entry, snap = _scan_cache, _snapshot
+    stats = {
+        "data_age_seconds": None if _bulk_loaded_at is None else round(now - _bulk_loaded_at, 1),
+        "stale": _bulk_loaded_at is None or now - _bulk_loaded_at > 2 * REFRESH_SECONDS,
+        "refresh_seconds": REFRESH_SECONDS,
+        "window": [START_DATE, END_DATE],
+        "symbols_configured": len(all_stocks),
+        "symbols_loaded": 0 if snap is None else _loaded_symbols(snap),
+        "last_candle": None,
+        "download_seconds": _download_stats["seconds"],
+        "download_kind": _download_stats["kind"],
+        "symbols_failed": _download_stats["failed"],
+        "scan_seconds": entry["seconds"],
+        "scan_age_seconds": None if entry["scanned_at"] is None else round(now - entry["scanned_at"], 1),
+        "result_count": None if entry["results"] is None else len(entry["results"]),
+    }
+    if snap is not None and len(snap.bulk):
+        stats["last_candle"] = str(snap.bulk.dates[-1].date())
+    return stats
+
+
+def readiness() -> dict:
+    if is_ready():
+        state = {"status": "ready"}
+    elif _warmup["error"]:
+        retry = RETRY_SECONDS - (time.monotonic() - _warmup["failed_at"])
+        state = {"status": "failed", "error": _warmup["error"],
+                 "retry_in_seconds": max(0, round(retry))}
+    else:
+        state = {"status": "warming"}
+    state.update(cache_stats())
+    return state
 
 
 # ── Helpers ───────────────────────────────────────────────────────────
+def _stage(name: str):
+    """Time a block into the ``v20_stage_seconds`` histogram."""
+    return metrics.STAGE_SECONDS.labels(stage=name).time()
+
+
 def get_df(symbol: str) -> pd.DataFrame | None:
+    if symbol in all_stocks:
+        arrays = symbol_arrays(symbol)
+        if arrays is None:
+            return None
+        dates = arrays.pop('dates')
+        # Columns wrap the cached arrays; they are read-only, so writing to
+        # a cell raises instead of corrupting the cache (use .copy() first)
+        return pd.DataFrame(arrays, index=dates, copy=False)
+
     bulk = _get_bulk()
-    try:
-        df = bulk[f"{symbol}.NS"].dropna()
-    except KeyError:
+    series = bulk.series(f"{symbol}.NS")
+    if series is None:
         return None
 
-    if df.empty:
+    valid = ~np.isnan(series).any(axis=0)
+    if not valid.any():
         return None
 
-    df = df[['Open', 'High', 'Low', 'Close']].copy()
-    df['MA200'] = df['Close'].rolling(window=200).mean()
+    df = pd.DataFrame({'Open': series[0, valid], 'High': series[1, valid],
+                       'Low': series[2, valid], 'Close': series[3, valid]},
+                      index=bulk.dates[valid])
+    for w in MA_WINDOWS:
+        df[f'MA{w}'] = df['Close'].rolling(window=w).mean()
     return df
 
 
+# ── Vectorized signal engine ──────────────────────────────────────────
+def _streak_segments(green: np.ndarray, closer: np.ndarray,
+                     high: np.ndarray, low: np.ndarray):
+    """Find every green-candle streak that is closed by a ``closer`` row.
+
+    Returns ``(close_idx, streak_low, streak_high)`` with one entry per
+    closed streak, ``close_idx`` being the row of the closing candle.
+    """
+    n = len(green)
+    prev_green = np.concatenate(([False], green[:-1]))
+    next_green = np.concatenate((green[1:], [False]))
+    starts = np.flatnonzero(green & ~prev_green)
+    if not starts.size:
+        empty = np.empty(0)
+        return np.empty(0, dtype=np.intp), empty, empty
+
+    # Non-green rows are neutral, so each reduceat slice only sees its streak
+    streak_low = np.minimum.reduceat(np.where(green, low, np.inf), starts)
+    streak_high = np.maximum.reduceat(np.where(green, high, -np.inf), starts)
+
+    close_idx = np.flatnonzero(green & ~next_green) + 1
+    closed = close_idx < n
+    closed[closed] = closer[close_idx[closed]]
+    return close_idx[closed], streak_low[closed], streak_high[closed]
+
+
+def _qualify(streak_low: np.ndarray, streak_high: np.ndarray,
+             ma_at_close: np.ndarray, threshold: float | None = None):
+    """Return ``(pct_move, mask)`` for streaks that form a V20 signal.
+
+    ``threshold`` defaults to THRESHOLD_PERCENT.
+    """
+    threshold = THRESHOLD_PERCENT if threshold is None else threshold
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_move = (streak_high - streak_low) / streak_low * 100
+    mask = ((streak_low != 0) & (streak_high != 0)
+            & (pct_move >= threshold) & (streak_low < ma_at_close))
+    return pct_move, mask
+
+
 def find_v20_signals(df: pd.DataFrame):
-    signals = []
-    latest_close = df['Close'].iloc[-1]
-    streak_low = streak_high = None
+    if df.empty:
+        return []
+    opens, highs, lows, closes = (
+        df[col].to_numpy() for col in ('Open', 'High', 'Low', 'Close')
+    )
+    ma200 = df['MA200'].to_numpy() if 'MA200' in df else None
+    return _signals_from_arrays(df.index, opens, highs, lows, closes, ma200)
 
-    for idx in range(1, len(df)):
-        cur = df.iloc[idx]
 
-        # Green candle
-        if cur['Close'] > cur['Open']:
-            streak_low = cur['Low'] if streak_low is None else min(streak_low, cur['Low'])
-            streak_high = cur['High'] if streak_high is None else max(streak_high, cur['High'])
-            continue
+def _signals_from_arrays(dates: pd.DatetimeIndex, opens: np.ndarray, highs: np.ndarray,
+                         lows: np.ndarray, closes: np.ndarray, ma200: np.ndarray | None):
+    """``find_v20_signals`` over plain (possibly read-only) arrays."""
+    # Row 0 neither opens nor closes a streak
+    green = closes > opens
+    green[0] = False
+    closer = ~green
+    closer[0] = False
 
-        # Red candle ends streak
-        if streak_low and streak_high:
-            pct_move = (streak_high - streak_low) / streak_low * 100
-            if pct_move >= THRESHOLD_PERCENT and streak_low < cur.get('MA200', float('inf')):
-                proximity = abs(latest_close - streak_low) / streak_low * 100
-                signals.append((
-                    df.index[idx].date(), round(streak_low, 2), round(streak_high, 2),
-                    round(pct_move, 2), round(latest_close, 2), round(proximity, 2)
-                ))
-        streak_low = streak_high = None
-    return signals
+    close_idx, streak_low, streak_high = _streak_segments(green, closer, highs, lows)
+    # Only the streak extremes are widened to float64, not whole columns
+    streak_low, streak_high = streak_low.astype(float), streak_high.astype(float)
+    if ma200 is not None:
+        ma_at_close = np.asarray(ma200, dtype=float)[close_idx]
+    else:
+        ma_at_close = np.full(len(close_idx), np.inf)
 
+    pct_move, mask = _qualify(streak_low, streak_high, ma_at_close)
+    close_idx, streak_low, streak_high, pct_move = (
+        close_idx[mask], streak_low[mask], streak_high[mask], pct_move[mask]
+    )
 
-# ── Main function called by Flask ─────────────────────────────────────
-def scan_stocks():
-    results = []
-    for sym in all_stocks:
-        df = get_df(sym)
-        if df is None:
+    latest_close = float(closes[-1])
+    proximity = np.abs(latest_close - streak_low) / streak_low * 100
+    n = len(close_idx)
+    return list(zip(
+        (ts.date() for ts in dates[close_idx]),
+        np.round(streak_low, 2).tolist(),
+        np.round(streak_high, 2).tolist(),
+        np.round(pct_move, 2).tolist(),
+        [float(np.round(latest_close, 2))] * n,
+        np.round(proximity, 2).tolist(),
+    ))
+
+
+# ── Panel engine (all symbols at once) ────────────────────────────────
+def _panel_arrays(bulk: PricePanel, symbols: list[str]):
+    """Turn the price panel into 2D (dates x symbols) float64 OHLC arrays.
+
+    Each symbol column is compacted so its valid rows come first in date
+    order, mirroring the per-symbol NaN filtering done by ``get_df``.
+    Returns ``(order, lengths, opens, highs, lows, closes)`` where
+    ``order[r, j]`` is the row of ``bulk.dates`` behind compacted row ``r``.
+    """
+    cube = bulk.take([s + ".NS" for s in symbols])
+    valid = ~np.isnan(cube).any(axis=0).T
+    order = np.argsort(~valid, axis=0, kind="stable")
+    lengths = valid.sum(axis=0)
+    in_range = np.arange(len(bulk))[:, None] < lengths
+
+    ohlc = []
+    for field in cube:
+        arr = np.take_along_axis(field.T, order, axis=0).astype(float)
+        arr[~in_range] = np.nan
+        ohlc.append(arr)
+    return (order, lengths, *ohlc)
+
+
+def _panel_ma(closes: np.ndarray, window: int) -> np.ndarray:
+    """Per-symbol moving average over compacted closes."""
+    return pd.DataFrame(closes).rolling(window=window).mean().to_numpy()
+
+
+def _panel_ma200(closes: np.ndarray) -> np.ndarray:
+    return _panel_ma(closes, 200)
+
+
+def _panel_streaks(lengths: np.ndarray, opens: np.ndarray, highs: np.ndarray,
+                   lows: np.ndarray, closes: np.ndarray):
+    """Every closed green streak in compacted panel arrays, before any
+    threshold or MA test.
+
+    Returns ``(sym_idx, row_idx, streak_low, streak_high)`` in symbol
+    order, then date; ``row_idx`` is the compacted row of the closing candle.
+    """
+    n_rows = closes.shape[0]
+    pos = np.arange(n_rows)[:, None]
+    in_range = pos < lengths
+    green = in_range & (closes > opens) & (pos >= 1)
+    closer = in_range & ~green & (pos >= 1)
+
+    # Symbol-major flattening; row 0 of every symbol is never green or a
+    # closer, so no streak can leak from one symbol into the next.
+    green, closer, highs, lows = (
+        np.ravel(a, order="F") for a in (green, closer, highs, lows)
+    )
+    close_idx, streak_low, streak_high = _streak_segments(green, closer, highs, lows)
+    sym_idx, row_idx = np.divmod(close_idx, n_rows)
+    return sym_idx, row_idx, streak_low, streak_high
+
+
+def _panel_signals(index: pd.DatetimeIndex, symbols: list[str], order: np.ndarray,
+                   lengths: np.ndarray, opens: np.ndarray, highs: np.ndarray,
+                   lows: np.ndarray, closes: np.ndarray, ma200: np.ndarray) -> list[dict]:
+    """Signal detection over compacted panel arrays from ``_panel_arrays``."""
+    n_syms = closes.shape[1]
+    sym_idx, row_idx, streak_low, streak_high = _panel_streaks(lengths, opens, highs,
+                                                               lows, closes)
+    pct_move, mask = _qualify(streak_low, streak_high, ma200[row_idx, sym_idx])
+    sym_idx, row_idx, streak_low, streak_high, pct_move = (
+        sym_idx[mask], row_idx[mask], streak_low[mask], streak_high[mask], pct_move[mask]
+    )
+
+    latest_close = closes[np.maximum(lengths - 1, 0), np.arange(n_syms)][sym_idx]
+    proximity = np.abs(latest_close - streak_low) / streak_low * 100
+    sig_dates = [str(ts.date()) for ts in index[order[row_idx, sym_idx]]]
+    return _result_dicts(symbols, sym_idx, sig_dates, streak_low, streak_high,
+                         pct_move, latest_close, proximity)
+
+
+def _result_dicts(symbols, sym_idx, sig_dates, streak_low, streak_high,
+                  pct_move, latest_close, proximity) -> list[dict]:
+    return [
+        {
+            'SignalDate': sig_date,
+            'Symbol': symbols[j],
+            'BuyAt': buy,
+            'SellAt': sell,
+            '%Move': pct,
+            'Close': close,
+            'Proximity%': prox
+        }
+        for sig_date, j, buy, sell, pct, close, prox in zip(
+            sig_dates, sym_idx.tolist(),
+            np.round(streak_low, 2).tolist(),
+            np.round(streak_high, 2).tolist(),
+            np.round(pct_move, 2).tolist(),
+            np.round(latest_close, 2).tolist(),
+            np.round(proximity, 2).tolist(),
+        )
+    ]
+
+
+def scan_panel(bulk: PricePanel, symbols: list[str] | None = None) -> list[dict]:
+    """Run the V20 scan for every symbol of ``bulk`` in one vectorized pass.
+
+    Produces the same result dicts, in the same pre-sort order, as calling
+    ``get_df`` and ``find_v20_signals`` symbol by symbol.
+    """
+    symbols = all_stocks if symbols is None else symbols
+    with _stage("load"):
+        order, lengths, opens, highs, lows, closes = _panel_arrays(bulk, symbols)
+    if not closes.size:
+        return []
+    with _stage("ma200"):
+        ma200 = _panel_ma200(closes)
+    with _stage("signals"):
+        return _panel_signals(bulk.dates, symbols, order, lengths,
+                              opens, highs, lows, closes, ma200)
+
+
+# ── Incremental scan (persisted MA and streak state) ──────────────────
+_ma_state = None
+_scan_state = None
+_scan_state_lock = threading.Lock()
+
+
+def _row_arrays(frame: PricePanel, symbols: list[str]):
+    """Uncompacted (dates x symbols) OHLC arrays plus a complete-candle mask."""
+    cube = frame.take([s + ".NS" for s in symbols])
+    valid = ~np.isnan(cube).any(axis=0).T
+    opens, highs, lows, closes = (field.T.astype(float) for field in cube)
+    return frame.dates.to_numpy(dtype="datetime64[ns]"), opens, highs, lows, closes, valid
+
+
+def _seed_means(means: RollingMeans, cols: np.ndarray, lengths: np.ndarray,
+                closes: np.ndarray) -> None:
+    """Load symbols ``cols`` of ``means`` with their last compacted closes
+    (``_panel_arrays`` layout, one column per entry of ``cols``)."""
+    k = np.arange(len(cols))
+    for w in means.windows:
+        # Last `w` valid closes, oldest first, NaN-padded on top
+        take = lengths[None, :] - w + np.arange(w)[:, None]
+        ring = np.where(take >= 0, closes[np.clip(take, 0, None), k], np.nan)
+        means.rings[w][:, cols] = ring
+        means.heads[w][cols] = 0
+        means.sums[w][cols] = np.nansum(ring, axis=0)
+    means.count[cols] = lengths
+
+
+def _bootstrap_state(bulk: PricePanel, symbols: list[str],
+                     lineage) -> tuple[RollingMeans, ScanState]:
+    """Build running MA sums and scanner state for all of ``bulk`` at once."""
+    means = RollingMeans(symbols, MA_WINDOWS, lineage)
+    state = ScanState(symbols, lineage)
+    order, lengths, opens, highs, lows, closes = _panel_arrays(bulk, symbols)
+    n_rows, n_syms = closes.shape
+    if not n_rows or not n_syms:
+        return means, state
+    cols = np.arange(n_syms)
+    pos = np.arange(n_rows)[:, None]
+    in_range = pos < lengths
+
+    _seed_means(means, cols, lengths, closes)
+    dates = bulk.dates.to_numpy(dtype="datetime64[ns]")
+
+    ma200 = _panel_ma(closes, state.window)
+    green = in_range & (closes > opens) & (pos >= 1)
+    closer = in_range & ~green & (pos >= 1)
+    flat = [np.ravel(a, order="F") for a in (green, closer, highs, lows, ma200)]
+    close_idx, streak_low, streak_high = _streak_segments(*flat[:4])
+    ma_at_close = flat[4][close_idx]
+    keep = streak_low < ma_at_close
+    sym_idx, row_idx = np.divmod(close_idx[keep], n_rows)
+    state.record_closed(sym_idx, dates[order[row_idx, sym_idx]],
+                        streak_low[keep], streak_high[keep], ma_at_close[keep])
+
+    # Green run still open after each symbol's last candle
+    last_break = np.where(in_range & ~green, pos, -1).max(axis=0)
+    open_rows = (pos > last_break) & in_range
+    state.streak_low = np.where(open_rows, lows, np.inf).min(axis=0)
+    state.streak_high = np.where(open_rows, highs, -np.inf).max(axis=0)
+    state.in_streak = open_rows.any(axis=0)
+    state.count = lengths.astype(np.int64)
+    state.last_close = np.where(lengths > 0, closes[np.maximum(lengths - 1, 0), cols], np.nan)
+    state.last_date = dates[-1]
+    return means, state
+
+
+def _sync_state(bulk: PricePanel, symbols: list[str],
+                lineage: str) -> tuple[RollingMeans, ScanState]:
+    """Commit MA and streak state through the second-to-last row of ``bulk``,
+    whose price history is ``lineage``.
+
+    The newest candle stays provisional (a delta refresh re-fetches it).
+    Both are rebuilt from scratch when the symbol list or the lineage (a
+    new full download) changes. With a store, committed state is saved
+    there per lineage, so a restarted worker resumes instead of
+    rebuilding. Callers hold ``_scan_state_lock``.
+    """
+    global _ma_state, _scan_state
+    committed = bulk.slice(None, -1)
+    means, state = _ma_state, _scan_state
+    if state is None or state.lineage != lineage:
+        means, state = _load_state(lineage) or (means, state)
+    if (state is None or means is None or state.symbols != list(symbols)
+            or state.lineage != lineage or state.last_date is None
+            or state.last_date not in committed.dates.to_numpy(dtype="datetime64[ns]")):
+        means, state = _bootstrap_state(committed, symbols, lineage)
+        _save_state(means, state)
+    else:
+        new_rows = committed.after(state.last_date)
+        if len(new_rows):
+            dates, opens, highs, lows, closes, valid = _row_arrays(new_rows, symbols)
+            ma = means.advance(dates, closes, valid)
+            state.advance(dates, opens, highs, lows, closes, valid, ma[state.window])
+            _save_state(means, state)
+    _ma_state, _scan_state = means, state
+    return means, state
+
+
+def _load_state(lineage: str) -> tuple[RollingMeans, ScanState] | None:
+    """State another process saved for price ``lineage``, if any."""
+    if not STORE_DIR:
+        return None
+    arrays = store.load_state(STORE_DIR, lineage)
+    if arrays is None:
+        return None
+    try:
+        state = ScanState.from_arrays(
+            {k.removeprefix("scan_"): v for k, v in arrays.items() if k.startswith("scan_")},
+            lineage)
+        means = RollingMeans.from_arrays(
+            {k.removeprefix("ma_"): v for k, v in arrays.items() if k.startswith("ma_")},
+            state.symbols, lineage)
+    except (KeyError, ValueError):
+        return None     # older layout: rebuild
+    return means, state
+
+
+def _save_state(means: RollingMeans, state: ScanState) -> None:
+    if not STORE_DIR or state.last_date is None:
+        return
+    arrays = {f"scan_{k}": v for k, v in state.to_arrays().items()}
+    arrays.update({f"ma_{k}": v for k, v in means.to_arrays().items()})
+    try:
+        store.save_state(STORE_DIR, state.lineage, arrays)
+    except OSError:
+        log.exception("Could not write scan state to %s", STORE_DIR)
+
+
+def _ma_ready_dates(bulk: PricePanel, symbols: list[str], window: int) -> np.ndarray:
+    """Date of each symbol's ``window``-th complete candle in ``bulk``.
+
+    Only the head of the frame is read unless a symbol is still short of
+    ``window`` candles there. Symbols that never get there map to NaT.
+    """
+    ready = np.full(len(symbols), np.datetime64("NaT"), dtype="datetime64[ns]")
+    pending = np.arange(len(symbols))
+    for frame in (bulk.slice(None, 2 * window + 50), bulk):
+        if not pending.size:
+            break
+        dates, *_, valid = _row_arrays(frame, [symbols[j] for j in pending])
+        seen = np.cumsum(valid, axis=0)
+        hit = seen[-1] >= window if len(seen) else np.zeros(len(pending), dtype=bool)
+        rows = np.argmax(seen >= window, axis=0)
+        ready[pending[hit]] = dates[rows[hit]]
+        pending = pending[~hit]
+    return ready
+
+
+def _state_results(state: ScanState, bulk: PricePanel) -> list[dict]:
+    """Scan results for ``bulk`` from state advanced through its last row."""
+    sym_idx, dates, streak_low, streak_high, _ = state.closed_streaks()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_move = (streak_high - streak_low) / streak_low * 100
+    # Closed streaks already passed "low < MA"; the window's first
+    # MA-window candles have no MA200 in a fresh scan, so drop those too.
+    ready = _ma_ready_dates(bulk, state.symbols, state.window)[sym_idx]
+    mask = ((streak_low != 0) & (streak_high != 0) & (pct_move >= THRESHOLD_PERCENT)
+            & ~np.isnat(ready) & (dates >= ready))
+    sym_idx, dates, streak_low, streak_high, pct_move = (
+        sym_idx[mask], dates[mask], streak_low[mask], streak_high[mask], pct_move[mask]
+    )
+    order = np.lexsort((dates, sym_idx))    # symbol order, then date, like scan_panel
+    sym_idx, dates, streak_low, streak_high, pct_move = (
+        sym_idx[order], dates[order], streak_low[order], streak_high[order], pct_move[order]
+    )
+    latest_close = state.last_close[sym_idx]
+    proximity = np.abs(latest_close - streak_low) / streak_low * 100
+    sig_dates = np.datetime_as_string(dates, unit="D").tolist()
+    return _result_dicts(state.symbols, sym_idx, sig_dates, streak_low, streak_high,
+                         pct_move, latest_close, proximity)
+
+
+def scan_incremental(bulk: PricePanel, symbols: list[str] | None = None,
+                     lineage: str | None = None) -> list[dict]:
+    """``scan_panel`` backed by persisted moving averages and streak state.
+
+    Only candles after the state's last committed date are processed; the
+    newest candle is applied to a copy of the state and never committed.
+    ``lineage`` is the snapshot lineage of ``bulk``; it may be left out
+    when ``bulk`` is the published snapshot's panel.
+    """
+    symbols = all_stocks if symbols is None else symbols
+    if lineage is None:
+        snap = _snapshot
+        if snap is None or snap.bulk is not bulk:
+            raise ValueError("lineage is required for a panel other than the published one")
+        lineage = snap.lineage
+    if bulk.empty:
+        return []
+    with _stage("state_sync"):
+        means, state = _sync_state(bulk, symbols, lineage)
+
+    with _stage("signals"):
+        dates, opens, highs, lows, closes, valid = _row_arrays(bulk.slice(-1), symbols)
+        ma = means.peek(closes[0], valid[0])[state.window]
+        view = state.copy()
+        view.advance(dates, opens, highs, lows, closes, valid, ma[None])
+        return _state_results(view, bulk)
+
+
+# ── Stored moving averages ────────────────────────────────────────────
+def _moving_averages(bulk: PricePanel, prev: Snapshot | None = None) -> dict:
+    """MA_WINDOWS moving averages of every ticker's complete candles as
+    float32 ``(ticker, date)`` arrays aligned with ``bulk.values``.
+
+    NaN where the ticker has no complete candle or fewer than ``w`` so far.
+    ``prev`` is a snapshot that ``bulk`` extends (same lineage): its values
+    are carried over and only the rows from its provisional last candle
+    on are computed. Otherwise every row is.
+    """
+    means = None if prev is None else _extend_means(prev, bulk)
+    if means is not None:
+        return means
+    symbols = [t.removesuffix(".NS") for t in bulk.tickers]
+    order, lengths, *_, closes = _panel_arrays(bulk, symbols)
+    in_range = np.arange(len(bulk))[:, None] < lengths
+    cols = np.nonzero(in_range)[1]
+    means = {}
+    for w in MA_WINDOWS:
+        ma = np.full((len(symbols), len(bulk)), np.nan, dtype=DTYPE)
+        ma[cols, order[in_range]] = _panel_ma(closes, w)[in_range]
+        ma.flags.writeable = False
+        means[w] = ma
+    return means
+
+
+
+def _tail_means(bulk: PricePanel, symbols: list[str], stop: int) -> RollingMeans:
+    """RollingMeans over the complete candles in rows ``:stop`` of ``bulk``.
+
+    Only the last rows are read unless a symbol has gaps there.
+    """
+    means = RollingMeans(symbols, MA_WINDOWS, None)
+    pending = np.arange(len(symbols))
+    for frame in (bulk.slice(max(stop - max(MA_WINDOWS) - 20, 0), stop), bulk.slice(None, stop)):
+        if not pending.size or not len(frame):
+            break
+        cube = frame.take([symbols[j] + ".NS" for j in pending])
+        valid = ~np.isnan(cube).any(axis=0).T
+        lengths = valid.sum(axis=0)
+        # Closes only, compacted like _panel_arrays
+        closes = np.take_along_axis(cube[FIELDS.index('Close')].T,
+                                    np.argsort(~valid, axis=0, kind="stable"), axis=0).astype(float)
+        done = (lengths >= max(MA_WINDOWS)) | (len(frame) == stop)
+        _seed_means(means, pending[done], lengths[done], closes[:, done])
+        pending = pending[~done]
+    return means
+
+
+def _extend_means(prev: Snapshot, bulk: PricePanel) -> dict | None:
+    """``_moving_averages`` of ``bulk`` from those of ``prev``, or None when
+    ``bulk`` does not simply extend it (different tickers or windows, or
+    changed rows)."""
+    old = prev.bulk
+    drop = int(old.dates.searchsorted(bulk.dates[0])) if len(bulk) else 0
+    keep = len(old) - 1 - drop      # committed rows of ``old`` still in ``bulk``
+    if (bulk.tickers != old.tickers or set(prev.means) != set(MA_WINDOWS) or keep < 0
+            or len(bulk) < keep or not bulk.dates[:keep].equals(old.dates[drop:drop + keep])):
+        return None
+
+    symbols = [t.removesuffix(".NS") for t in bulk.tickers]
+    rolling = _tail_means(bulk, symbols, keep)
+    dates, _, _, _, closes, valid = _row_arrays(bulk.slice(keep), symbols)
+    new_rows = rolling.advance(dates, closes, valid)
+    means = {}
+    for w in MA_WINDOWS:
+        ma = np.empty((len(symbols), len(bulk)), dtype=DTYPE)
+        ma[:, :keep] = prev.means[w][:, drop:drop + keep]
+        ma[:, keep:] = new_rows[w].T
+        if drop:
+            # Candles that left the window: the first `w` left in it get NaN again
+            ready = _ma_ready_dates(bulk, symbols, w)
+            rows = np.where(np.isnat(ready), keep, bulk.dates.searchsorted(ready))
+            rows = np.minimum(rows, keep)
+            head = int(rows.max(initial=0))
+            ma[:, :head][np.arange(head)[None, :] < rows[:, None]] = np.nan
+        ma.flags.writeable = False
+        means[w] = ma
+    return means
+
+
+# ── Per-symbol views (precomputed once per data version) ──────────────
+_views = {"key": None}
+
+
+def _symbol_views() -> dict:
+    """Where each configured symbol's complete candles live, per data version.
+
+    ``spans[symbol]`` is ``(col, rows)`` when the candles are one unbroken
+    run: a column of the panel and of its stored MAs, sliced by ``rows``,
+    so nothing is copied. Symbols with gaps inside their history map to
+    a dict of compacted read-only arrays instead.
+    """
+    global _views
+    snap = _get_snapshot()
+    key = (snap.version, tuple(all_stocks))
+    views = _views
+    if views["key"] == key:
+        return views
+
+    bulk, means = snap.bulk, snap.means
+    valid = np.ones(bulk.values.shape[1:], dtype=bool)  # (ticker, date)
+    for field in bulk.values:
+        valid &= ~np.isnan(field)
+    spans = {}
+    for s in all_stocks:
+        j = bulk._pos.get(s + ".NS")
+        rows = np.flatnonzero(valid[j]) if j is not None else ()
+        if not len(rows):
             continue
-        for sig in find_v20_signals(df):
-            sig_date, buy, sell, pct, close, prox = sig
-            results.append({
-                'SignalDate': str(sig_date),
-                'Symbol': sym,
-                'BuyAt': buy,
-                'SellAt': sell,
-                '%Move': pct,
-                'Close': close,
-                'Proximity%': prox
-            })
+        lo, hi = int(rows[0]), int(rows[-1]) + 1
+        if hi - lo == len(rows):
+            spans[s] = (j, slice(lo, hi))
+            continue
+        arrays = {'dates': bulk.dates[rows]}
+        arrays.update(zip(FIELDS, bulk.values[:, j, rows]))
+        arrays.update((f'MA{w}', ma[j, rows]) for w, ma in means.items())
+        for name, arr in arrays.items():
+            if name != 'dates':
+                arr.flags.writeable = False
+        spans[s] = arrays
+
+    views = {"key": key, "bulk": bulk, "means": means, "spans": spans}
+    _views = views
+    return views
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+def symbol_arrays(symbol: str) -> dict | None:
+    """Read-only views of a configured symbol's candles and moving averages.
+
+    Keys are ``dates`` (DatetimeIndex), Open/High/Low/Close (float32) and
+    ``MA<w>`` (float32) for each of MA_WINDOWS. Nothing is copied per call.
+    """
+    views = _symbol_views()
+    span = views["spans"].get(symbol)
+    if span is None:
+        return None
+    if isinstance(span, dict):
+        return dict(span)
+    j, rows = span
+    bulk = views["bulk"]
+    arrays = {'dates': bulk.dates[rows]}
+    arrays.update((field, _read_only(bulk.values[k, j, rows])) for k, field in enumerate(FIELDS))
+    arrays.update((f'MA{w}', _read_only(ma[j, rows])) for w, ma in views["means"].items())
+    return arrays
+
+
+def symbol_signals(symbol: str):
+    """``find_v20_signals(get_df(symbol))`` straight from the cached views.
+
+    Both compare against the stored float32 MA200, so nothing is computed
+    or copied per call beyond the signal rows themselves.
+    """
+    if symbol not in all_stocks:
+        df = get_df(symbol)
+        return [] if df is None else find_v20_signals(df)
+    arrays = symbol_arrays(symbol)
+    if arrays is None:
+        return []
+    return _signals_from_arrays(arrays['dates'], arrays['Open'], arrays['High'],
+                                arrays['Low'], arrays['Close'], arrays['MA200'])
+
+
+# ── Parallel panel scan ───────────────────────────────────────────────
+_pool = None
+_pool_workers = 0
+# Never fork the web process: its warm-up/refresh threads may hold locks
+_POOL_START = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+               else "spawn")
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers,
+                                    mp_context=multiprocessing.get_context(_POOL_START))
+        _pool_workers = workers
+    return _pool
+
+
+def _to_shared(arr: np.ndarray):
+    """Copy ``arr`` into a new shared-memory block; returns ``(shm, spec)``."""
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def _from_shared(spec):
+    """Attach to a block made by ``_to_shared``; returns ``(shm, view)``."""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _scan_shard(specs, index, symbols: list[str], lo: int, hi: int) -> list[dict]:
+    """Worker: scan symbol columns ``lo:hi`` of the shared panel arrays."""
+    attached = [_from_shared(spec) for spec in specs]
+    try:
+        order, lengths, opens, highs, lows, closes = (
+            np.array(view[..., lo:hi]) for _, view in attached
+        )
+    finally:
+        for shm, _ in attached:
+            shm.close()
+    ma200 = _panel_ma200(closes)
+    return _panel_signals(index, symbols, order, lengths,
+                          opens, highs, lows, closes, ma200)
+
+
+def scan_panel_parallel(bulk: PricePanel, symbols: list[str] | None = None,
+                        workers: int | None = None) -> list[dict]:
+    """``scan_panel`` sharded by symbol across a process pool.
+
+    The compacted panel arrays are placed in shared memory once; each task
+    only carries its column range. Shard results are concatenated in symbol
+    order, so the output matches ``scan_panel`` exactly.
+    """
+    symbols = all_stocks if symbols is None else symbols
+    workers = workers or SCAN_WORKERS or os.cpu_count() or 1
+    arrays = _panel_arrays(bulk, symbols)
+    if not arrays[-1].size:
+        return []
 
+    shared = [_to_shared(arr) for arr in arrays]
+    try:
+        specs = [spec for _, spec in shared]
+        bounds = np.linspace(0, len(symbols), min(workers, len(symbols)) + 1).astype(int)
+        pool = _get_pool(workers)
+        futures = [
+            pool.submit(_scan_shard, specs, bulk.dates, symbols[lo:hi], lo, hi)
+            for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo
+        ]
+        return [row for fut in futures for row in fut.result()]
+    finally:
+        for shm, _ in shared:
+            shm.close()
+            shm.unlink()
+
+
+def _sort_results(results: list[dict]) -> list[dict]:
     # Newest date first, then nearest proximity
     results.sort(key=lambda x: (x['SignalDate'], x['Proximity%']), reverse=True)
     return results
+
+
+# ── Scan result cache ─────────────────────────────────────────────────
+# Result dict keys in display order (also the DataTables column order)
+RESULT_COLUMNS = ['SignalDate', 'Symbol', 'BuyAt', 'SellAt', '%Move', 'Close', 'Proximity%']
+
+# Replaced as a whole so readers never see a key/results/index mismatch
+_scan_cache = {"key": None, "results": None, "index": None,
+               "seconds": None, "scanned_at": None}
+
+
+def _scan_key(snap: Snapshot) -> tuple:
+    """Fingerprint of everything a scan of ``snap`` depends on: data version + config."""
+    return (snap.version, THRESHOLD_PERCENT, START_DATE, END_DATE, tuple(all_stocks))
+
+
+def _build_index(results: list[dict]) -> dict:
+    """Column arrays, per-symbol row positions, per-column sort orders and a
+    lowercase search haystack over the sorted results."""
+    by_symbol = {}
+    for pos, row in enumerate(results):
+        by_symbol.setdefault(row['Symbol'], []).append(pos)
+    columns = {col: np.array([row[col] for row in results]) for col in RESULT_COLUMNS}
+    return {
+        "dates": columns['SignalDate'].astype("U10"),
+        "move": columns['%Move'].astype(float),
+        "proximity": columns['Proximity%'].astype(float),
+        "by_symbol": {sym: np.array(pos) for sym, pos in by_symbol.items()},
+        "order": {col: np.argsort(arr, kind="stable") for col, arr in columns.items()},
+        "haystack": np.array(
+            ["\t".join(str(row[col]) for col in RESULT_COLUMNS).lower() for row in results],
+            dtype=str,
+        ),
+    }
+
+
+def _scan_entry() -> dict:
+    global _scan_cache
+    snap = _get_snapshot()
+    bulk, key = snap.bulk, _scan_key(snap)
+    entry = _scan_cache
+    if entry["key"] == key:
+        metrics.SCAN_CACHE.labels(result="hit").inc()
+        return entry
+
+    metrics.SCAN_CACHE.labels(result="miss").inc()
+    t0 = time.perf_counter()
+    if SCAN_WORKERS > 1:
+        with _stage("signals"):
+            results = scan_panel_parallel(bulk, workers=SCAN_WORKERS)
+    elif INCREMENTAL_SCAN:
+        with _scan_state_lock:
+            results = scan_incremental(bulk, lineage=snap.lineage)
+    else:
+        results = scan_panel(bulk)
+    with _stage("sort"):
+        results = _sort_results(results)
+    with _stage("index"):
+        index = _build_index(results)
+    entry = {"key": key, "results": results, "index": index,
+             "seconds": time.perf_counter() - t0, "scanned_at": time.time()}
+    metrics.STAGE_SECONDS.labels(stage="scan").observe(entry["seconds"])
+    metrics.SIGNALS_EMITTED.inc(len(results))
+    _scan_cache = entry
+    return entry
+
+
+# ── Main function called by Flask ─────────────────────────────────────
+def scan_stocks():
+    return _scan_entry()["results"]
+
+
+def query_signals(symbols: list[str] | None = None, start: str | None = None,
+                  end: str | None = None, min_move: float | None = None,
+                  max_proximity: float | None = None) -> list[dict]:
+    """Filter the cached scan results; dates are inclusive ISO strings.
+
+    Output keeps the ``scan_stocks`` order (newest first, then proximity).
+    """
+    entry = _scan_entry()
+    results, index = entry["results"], entry["index"]
+
+    if symbols:
+        hits = [index["by_symbol"][s] for s in symbols if s in index["by_symbol"]]
+        rows = np.sort(np.concatenate(hits)) if hits else np.empty(0, dtype=int)
+    else:
+        rows = np.arange(len(results))
+
+    mask = np.ones(len(rows), dtype=bool)
+    if start:
+        mask &= index["dates"][rows] >= start
+    if end:
+        mask &= index["dates"][rows] <= end
+    if min_move is not None:
+        mask &= index["move"][rows] >= min_move
+    if max_proximity is not None:
+        mask &= index["proximity"][rows] <= max_proximity
+    return [results[i] for i in rows[mask].tolist()]
+
+
+def datatable_page(start: int = 0, length: int = 25, order_col: int | None = None,
+                   descending: bool = False, search: str = "") -> tuple[int, int, list[dict]]:
+    """One page of results for the DataTables server-side protocol.
+
+    ``order_col`` indexes ``RESULT_COLUMNS``; ``None`` keeps the default
+    scan order. ``length < 0`` means all rows. Returns
+    ``(records_total, records_filtered, rows)``.
+    """
+    entry = _scan_entry()
+    results, index = entry["results"], entry["index"]
+
+    if order_col is None:
+        rows = np.arange(len(results))
+    else:
+        rows = index["order"][RESULT_COLUMNS[order_col]]
+        if descending:
+            rows = rows[::-1]
+    if search:
+        hit = np.char.find(index["haystack"], search.lower()) >= 0
+        rows = rows[hit[rows]]
+
+    page = rows[start:] if length < 0 else rows[start:start + length]
+    return len(results), len(rows), [results[i] for i in page.tolist()]
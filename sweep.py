@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sweep.py – V20 parameter sweep in one pass
+Green streaks do not depend on the strategy parameters, so they are found
+once over the whole panel; each (threshold, MA window) pair is then only
+a mask over that streak table. Trying 10/15/20/25% costs one scan, not
+four.
+
+    cube = sweep.sweep([10, 15, 20, 25], ma_windows=(100, 200))
+    cube["counts"]                # signals per (threshold, window)
+    cube["results"][(20, 200)]    # same rows as scan_stocks() at 20% / MA200
+"""
+
+import numpy as np
+
+import strategy
+
+
+def streak_table(bulk=None, symbols: list[str] | None = None,
+                 ma_windows: tuple[int, ...] = (200,)) -> dict:
+    """Every closed green streak of ``bulk``, with what any parameter set needs.
+
+    Per streak: ``sym``, ``date`` and panel ``row`` of the closing candle, ``low``, ``high``,
+    ``pct`` (move in %), ``ok`` (non-zero low/high), ``proximity`` of the
+    symbol's latest close, and ``ma[w]`` at the closing candle for each
+    window. Defaults to the live panel and ``strategy.all_stocks``.
+    """
+    bulk = strategy._get_bulk() if bulk is None else bulk
+    symbols = strategy.all_stocks if symbols is None else list(symbols)
+    order, lengths, opens, highs, lows, closes = strategy._panel_arrays(bulk, symbols)
+    sym, row, low, high = strategy._panel_streaks(lengths, opens, highs, lows, closes)
+    pct, ok = strategy._qualify(low, high, np.full(len(low), np.inf), threshold=-np.inf)
+
+    cols = np.arange(len(symbols))
+    latest = (closes[np.maximum(lengths - 1, 0), cols] if len(closes)
+              else np.full(len(symbols), np.nan))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proximity = np.abs(latest[sym] - low) / low * 100
+    ma = {w: strategy._panel_ma(closes, w)[row, sym] for w in ma_windows}
+    dates = bulk.dates.to_numpy(dtype="datetime64[ns]")
+    panel_row = order[row, sym]
+    return {"symbols": symbols, "sym": sym, "row": panel_row, "date": dates[panel_row],
+            "low": low, "high": high, "pct": pct, "ok": ok,
+            "latest": latest, "proximity": proximity, "ma": ma}
+
+
+def evaluate(table: dict, thresholds, ma_windows: tuple[int, ...] | None = None,
+             with_results: bool = True) -> dict:
+    """Apply every (threshold, window) pair to a ``streak_table``.
+
+    Returns ``thresholds``, ``windows``, ``mask`` (thresholds x windows x
+    streaks), ``counts`` (thresholds x windows) and, with
+    ``with_results``, ``results[(threshold, window)]`` holding the rows
+    ``scan_stocks()`` would return for that pair, in the same order.
+    """
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+    windows = tuple(table["ma"] if ma_windows is None else ma_windows)
+    below = np.stack([table["ok"] & (table["low"] < table["ma"][w]) for w in windows])
+    mask = below[None, :, :] & (table["pct"] >= thresholds[:, None, None])
+    cube = {"thresholds": thresholds, "windows": windows, "mask": mask,
+            "counts": mask.sum(axis=2)}
+    if with_results:
+        cube["results"] = {
+            (t, w): _rows(table, mask[i, k])
+            for i, t in enumerate(thresholds.tolist()) for k, w in enumerate(windows)
+        }
+    return cube
+
+
+def _rows(table: dict, mask: np.ndarray) -> list[dict]:
+    sym = table["sym"][mask]
+    rows = strategy._result_dicts(
+        table["symbols"], sym, np.datetime_as_string(table["date"][mask], unit="D").tolist(),
+        table["low"][mask], table["high"][mask], table["pct"][mask],
+        table["latest"][sym], table["proximity"][mask],
+    )
+    return strategy._sort_results(rows)
+
+
+def sweep(thresholds, ma_windows: tuple[int, ...] = (200,), bulk=None,
+          symbols: list[str] | None = None, with_results: bool = True) -> dict:
+    """One streak pass, evaluated for every threshold and MA window."""
+    return evaluate(streak_table(bulk, symbols, tuple(ma_windows)), thresholds,
+                    with_results=with_results)
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Offline provider, no on-disk store and no warm-up thread for every test
+os.environ["V20_PROVIDER"] = "synthetic"
+os.environ["V20_STORE_DIR"] = ""
+os.environ["V20_WARMUP"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import strategy  # noqa: E402
+
+
+@pytest.fixture
+def fresh_strategy(monkeypatch):
+    """Run a test against empty strategy caches, restored afterwards."""
+    for name, value in {"_snapshot": None, "_ma_state": None, "_scan_state": None,
+                        "_views": {"key": None}}.items():
+        monkeypatch.setattr(strategy, name, value)
+    return strategy
+
+
+def make_df(n: int, seed: int, with_ma: bool = True, doji: float = 0.05) -> pd.DataFrame:
+    """Seeded random-walk OHLC; ``doji`` is the share of candles with close == open."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, n)))
+    opens = close * np.exp(rng.normal(0, 0.02, n))
+    flat = rng.random(n) < doji
+    opens[flat] = close[flat]
+    highs = np.maximum(opens, close) * (1 + rng.random(n) * 0.02)
+    lows = np.minimum(opens, close) * (1 - rng.random(n) * 0.02)
+    df = pd.DataFrame({'Open': opens, 'High': highs, 'Low': lows, 'Close': close},
+                      index=pd.bdate_range('2020-01-01', periods=n, name='Date'))
+    if with_ma:
+        df['MA200'] = df['Close'].rolling(200).mean()
+    return df
@@ -0,0 +1,45 @@
+import pytest
+
+import metrics
+import providers
+import strategy
+
+
+class FailingProvider:
+    """Synthetic data, except for the listed tickers, which always raise."""
+
+    def __init__(self, down):
+        self.down = down
+        self.synthetic = providers.get_provider("synthetic")
+
+    def download(self, tickers, start, end):
+        if any(t in self.down for t in tickers):
+            raise ConnectionError("offline")
+        return self.synthetic.download(tickers, start, end)
+
+
+@pytest.fixture
+def universe(monkeypatch):
+    monkeypatch.setattr(strategy, "all_stocks", ["AAA", "BBB", "CCC"])
+    monkeypatch.setattr(strategy, "DOWNLOAD_CHUNK", 1)
+    monkeypatch.setattr(strategy, "DOWNLOAD_RETRIES", 0)
+    monkeypatch.setattr(strategy, "_download_stats", dict(strategy._download_stats))
+    return monkeypatch
+
+
+@pytest.mark.parametrize("catch_up", [None, (["BBB"], "2020-06-01")])
+def test_total_outage_is_reported(universe, catch_up):
+    universe.setattr(strategy, "PROVIDER", FailingProvider({"AAA.NS", "BBB.NS", "CCC.NS"}))
+    before = metrics.FAILED_SYMBOLS.labels().value
+    with pytest.raises(RuntimeError, match="no data for any of 3"):
+        strategy._bulk_download("2021-01-01", "2021-06-01", catch_up=catch_up)
+    assert sorted(strategy._download_stats["failed"]) == ["AAA", "BBB", "CCC"]
+    assert metrics.FAILED_SYMBOLS.labels().value - before == 3
+
+
+def test_failed_catch_up_group(universe):
+    universe.setattr(strategy, "PROVIDER", FailingProvider({"BBB.NS"}))
+    bulk = strategy._bulk_download("2021-01-01", "2021-06-01", catch_up=(["BBB"], "2020-06-01"))
+    assert strategy._download_stats["failed"] == ["BBB"]
+    assert sorted(bulk.tickers) == ["AAA.NS", "CCC.NS"]
+    assert str(bulk.dates[0].date()) >= "2021-01-01"
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+import benchmark
+import strategy
+from panel import PricePanel
+
+
+@pytest.fixture
+def panel():
+    """Synthetic panel with random holes and one late listing."""
+    full, symbols = benchmark.synthetic_panel(60, 600, 4, 0.02)
+    values = full.values.copy()
+    values[np.random.default_rng(0).random(values.shape) < 0.01] = np.nan
+    values[:, 7, :300] = np.nan
+    return PricePanel(full.dates, full.tickers, values), symbols
+
+
+def _window(full: PricePanel, start: int, stop: int, bump: float = 1.0) -> PricePanel:
+    """Rows ``start:stop`` as a private copy; ``bump`` scales the last close
+    (a provisional candle that a later refresh corrects)."""
+    view = full.slice(start, stop)
+    values = view.values.copy()
+    values[3, :, -1] *= bump
+    return PricePanel(view.dates, view.tickers, values)
+
+
+def test_incremental_matches_full_scan(fresh_strategy, monkeypatch, panel):
+    full, symbols = panel
+    monkeypatch.setattr(strategy, "all_stocks", symbols)
+    monkeypatch.setattr(strategy, "THRESHOLD_PERCENT", 5)
+    first = _window(full, 0, 400)
+    strategy._set_bulk(first)
+    lineage = strategy._snapshot.lineage
+    assert strategy.scan_panel(first)
+    assert strategy.scan_incremental(first) == strategy.scan_panel(first)
+
+    for stop in range(401, 600, 23):
+        bulk = _window(full, stop - 380, stop, bump=1.03)
+        strategy._set_bulk(bulk, lineage=lineage)
+        assert strategy.scan_incremental(bulk) == strategy.scan_panel(bulk)
+
+
+def test_state_resumes_from_store(fresh_strategy, monkeypatch, tmp_path, panel):
+    full, symbols = panel
+    monkeypatch.setattr(strategy, "all_stocks", symbols)
+    monkeypatch.setattr(strategy, "THRESHOLD_PERCENT", 5)
+    monkeypatch.setattr(strategy, "STORE_DIR", str(tmp_path))
+    bulk = _window(full, 0, 500)
+    strategy._set_bulk(bulk)
+    expected = strategy.scan_incremental(bulk)
+    assert expected
+    assert list(tmp_path.glob("state-*.npz"))
+
+    # A restarted worker: same snapshot and lineage, no in-memory state
+    monkeypatch.setattr(strategy, "_ma_state", None)
+    monkeypatch.setattr(strategy, "_scan_state", None)
+    monkeypatch.setattr(strategy, "_bootstrap_state", pytest.fail)
+    assert strategy.scan_incremental(bulk) == expected
+
+    later = _window(full, 0, 540)
+    strategy._set_bulk(later, lineage=strategy._snapshot.lineage)
+    monkeypatch.setattr(strategy, "_ma_state", None)
+    monkeypatch.setattr(strategy, "_scan_state", None)
+    assert strategy.scan_incremental(later) == strategy.scan_panel(later)
+
+
+def test_refresh_during_scan(fresh_strategy, monkeypatch, panel):
+    """A snapshot swapped in mid-scan must not inherit the old results."""
+    full, symbols = panel
+    monkeypatch.setattr(strategy, "all_stocks", symbols)
+    monkeypatch.setattr(strategy, "THRESHOLD_PERCENT", 5)
+    old, new = _window(full, 0, 500), _window(full, 0, 560)
+    strategy._set_bulk(old)
+    version = strategy._snapshot.version
+
+    scan = strategy.scan_incremental
+
+    def scan_then_refresh(bulk, *args, **kwargs):
+        results = scan(bulk, *args, **kwargs)
+        strategy._set_bulk(new)
+        return results
+
+    monkeypatch.setattr(strategy, "scan_incremental", scan_then_refresh)
+    assert strategy.scan_stocks() == strategy._sort_results(strategy.scan_panel(old))
+    assert strategy._scan_cache["key"][0] == version
+
+    monkeypatch.setattr(strategy, "scan_incremental", scan)
+    assert strategy.scan_stocks() == strategy._sort_results(strategy.scan_panel(new))
+
+
+def test_full_download_during_scan(fresh_strategy, monkeypatch, tmp_path, panel):
+    """State built from the old panel stays under the old lineage."""
+    full, symbols = panel
+    monkeypatch.setattr(strategy, "all_stocks", symbols)
+    monkeypatch.setattr(strategy, "THRESHOLD_PERCENT", 5)
+    monkeypatch.setattr(strategy, "STORE_DIR", str(tmp_path))
+    old, new = _window(full, 0, 500), _window(full, 40, 560, bump=0.9)
+    strategy._set_bulk(old)
+    old_lineage = strategy._snapshot.lineage
+
+    sync = strategy._sync_state
+
+    def refresh_then_sync(*args):
+        strategy._set_bulk(new)     # a full download: new lineage
+        return sync(*args)
+
+    monkeypatch.setattr(strategy, "_sync_state", refresh_then_sync)
+    assert strategy.scan_stocks() == strategy._sort_results(strategy.scan_panel(old))
+    assert strategy._scan_state.lineage == old_lineage
+    assert [p.name for p in tmp_path.glob("state-*.npz")] == [f"state-{old_lineage}.npz"]
+
+    monkeypatch.setattr(strategy, "_sync_state", sync)
+    assert strategy.scan_stocks() == strategy._sort_results(strategy.scan_panel(new))
+    assert strategy._scan_state.lineage == strategy._snapshot.lineage != old_lineage
+
+
+def test_stored_means_extend_previous_snapshot(fresh_strategy, monkeypatch, panel):
+    """Delta snapshots carry their MAs over instead of recomputing history."""
+    full, _ = panel
+    monkeypatch.setattr(strategy, "MA_WINDOWS", (50, 200))
+    strategy._set_bulk(_window(full, 0, 400, bump=1.03))
+    for stop in (401, 402, 430, 480, 600):
+        bulk = _window(full, stop - 390, stop, bump=1.03)
+        expected = strategy._moving_averages(bulk)
+        with monkeypatch.context() as mp:
+            mp.setattr(strategy, "_panel_ma", pytest.fail)
+            means = strategy._moving_averages(bulk, strategy._snapshot)
+        for w in (50, 200):
+            np.testing.assert_allclose(means[w], expected[w], rtol=1e-6, equal_nan=True)
+        strategy._set_bulk(bulk, lineage=strategy._snapshot.lineage, means=means)
+
+    # Rows the previous snapshot never had in the same place: full rebuild
+    shifted = _window(full, 205, 590)
+    assert strategy._extend_means(strategy._snapshot, shifted) is None
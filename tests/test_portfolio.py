@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+import benchmark
+import portfolio
+import strategy
+from panel import PricePanel
+
+
+@pytest.fixture(scope="module")
+def scan():
+    bulk, symbols = benchmark.synthetic_panel(300, 500, 2, 0.02)
+    values = bulk.values.copy()
+    values[np.random.default_rng(1).random(values.shape) < 0.01] = np.nan
+    bulk = PricePanel(bulk.dates, bulk.tickers, values)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(strategy, "all_stocks", symbols)
+        mp.setattr(strategy, "THRESHOLD_PERCENT", 10)
+        signals = strategy._sort_results(strategy.scan_panel(bulk))
+    return bulk, signals
+
+
+def reference(signals, bulk, capital, max_positions, sizing, size):
+    """Day-by-day account: exits first, then entries oldest signal first."""
+    symbols = list(dict.fromkeys(r['Symbol'] for r in signals))
+    sym = np.array([symbols.index(r['Symbol']) for r in signals])
+    signal_row = bulk.dates.get_indexer(pd.DatetimeIndex([r['SignalDate'] for r in signals]))
+    buy = np.array([r['BuyAt'] for r in signals])
+    sell = np.array([r['SellAt'] for r in signals])
+    trades = backtest.simulate(bulk, [s + ".NS" for s in symbols], sym, signal_row, buy, sell)
+    closes = bulk.take([s + ".NS" for s in symbols])[3].astype(float)
+    last = pd.DataFrame(closes.T).ffill().to_numpy().T
+
+    by_entry = {}
+    for i in np.flatnonzero(trades["entered"]):
+        by_entry.setdefault(int(trades["entry_row"][i]), []).append(i)
+    cash, held, ledger, equity = capital, {}, [], []
+    for t in range(len(bulk)):
+        for k in [k for k in held if trades["hit"][k] and trades["exit_row"][k] == t]:
+            cash += held.pop(k) * sell[k]
+        for i in sorted(by_entry.get(t, []), key=lambda i: (signal_row[i], i)):
+            if len(held) >= max_positions or any(sym[k] == sym[i] for k in held):
+                continue
+            marked = cash + sum(q * last[sym[k], t - 1] for k, q in held.items()
+                                if not math.isnan(last[sym[k], t - 1]))
+            amount = {"equal": marked / max_positions, "fraction": (size or 0) * marked,
+                      "fixed": size}[sizing]
+            qty = math.floor(min(amount, cash) / buy[i])
+            if qty > 0:
+                cash -= qty * buy[i]
+                held[i] = qty
+                ledger.append((symbols[sym[i]], signals[i]['SignalDate'], qty))
+        equity.append(cash + sum(q * last[sym[k], t] for k, q in held.items()
+                                 if not math.isnan(last[sym[k], t])))
+    return ledger, np.array(equity)
+
+
+@pytest.mark.parametrize("max_positions, sizing, size", [
+    (10, "equal", None), (5, "fraction", 0.3), (20, "fixed", 40_000.0),
+])
+def test_matches_day_loop(scan, max_positions, sizing, size):
+    bulk, signals = scan
+    result = portfolio.simulate_portfolio(signals, bulk, capital=1_000_000.0,
+                                          max_positions=max_positions, sizing=sizing, size=size)
+    ledger, equity = reference(signals, bulk, 1_000_000.0, max_positions, sizing, size)
+    assert ledger
+    assert [(r['Symbol'], r['SignalDate'], r['Shares']) for r in result["ledger"]] == ledger
+    np.testing.assert_allclose(result["equity"]["Equity"].to_numpy(), equity, rtol=1e-9)
+    assert result["summary"]["taken"] == len(ledger)
+    assert (result["equity"]["Positions"] <= max_positions).all()
+
+
+def test_rejects_bad_sizing(scan):
+    bulk, signals = scan
+    with pytest.raises(ValueError):
+        portfolio.simulate_portfolio(signals, bulk, sizing="kelly")
+    with pytest.raises(ValueError):
+        portfolio.simulate_portfolio(signals, bulk, sizing="fixed")
+
+
+def test_no_signals(scan):
+    bulk, _ = scan
+    result = portfolio.simulate_portfolio([], bulk, capital=1000.0)
+    assert result["ledger"] == []
+    assert (result["equity"]["Equity"] == 1000.0).all()
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import benchmark
+import strategy
+from conftest import make_df
+from panel import PricePanel
+
+
+def reference_signals(df, threshold):
+    """The original row-by-row ``find_v20_signals`` loop."""
+    signals = []
+    latest_close = df['Close'].iloc[-1]
+    streak_low = streak_high = None
+
+    for idx in range(1, len(df)):
+        cur = df.iloc[idx]
+
+        # Green candle
+        if cur['Close'] > cur['Open']:
+            streak_low = cur['Low'] if streak_low is None else min(streak_low, cur['Low'])
+            streak_high = cur['High'] if streak_high is None else max(streak_high, cur['High'])
+            continue
+
+        # Red candle ends streak
+        if streak_low and streak_high:
+            pct_move = (streak_high - streak_low) / streak_low * 100
+            if pct_move >= threshold and streak_low < cur.get('MA200', float('inf')):
+                proximity = abs(latest_close - streak_low) / streak_low * 100
+                signals.append((
+                    df.index[idx].date(), round(streak_low, 2), round(streak_high, 2),
+                    round(pct_move, 2), round(latest_close, 2), round(proximity, 2)
+                ))
+        streak_low = streak_high = None
+    return signals
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("with_ma", [True, False])
+@pytest.mark.parametrize("doji", [0.0, 0.2])
+def test_matches_reference_loop(monkeypatch, seed, with_ma, doji):
+    monkeypatch.setattr(strategy, "THRESHOLD_PERCENT", 5)
+    df = make_df(600, seed, with_ma=with_ma, doji=doji)
+    expected = reference_signals(df, 5)
+    assert expected
+    assert strategy.find_v20_signals(df) == expected
+
+
+def test_threshold_is_read_at_call_time(monkeypatch):
+    df = make_df(600, 1)
+    for threshold in (5, 10, 20):
+        monkeypatch.setattr(strategy, "THRESHOLD_PERCENT", threshold)
+        assert strategy.find_v20_signals(df) == reference_signals(df, threshold)
+
+
+def test_short_frames(monkeypatch):
+    monkeypatch.setattr(strategy, "THRESHOLD_PERCENT", 5)
+    df = make_df(600, 2)
+    for n in (1, 2, 3):
+        assert strategy.find_v20_signals(df.iloc[:n]) == reference_signals(df.iloc[:n], 5)
+    assert strategy.find_v20_signals(df.iloc[:0]) == []
+
+
+def test_symbol_signals_match_get_df(fresh_strategy, monkeypatch):
+    bulk, symbols = benchmark.synthetic_panel(40, 500, 3, 0.03)
+    values = bulk.values.copy()
+    values[np.random.default_rng(2).random(values.shape) < 0.01] = np.nan
+    monkeypatch.setattr(strategy, "all_stocks", symbols)
+    monkeypatch.setattr(strategy, "THRESHOLD_PERCENT", 10)
+    strategy._set_bulk(PricePanel(bulk.dates, bulk.tickers, values))
+    monkeypatch.setattr(strategy, "_panel_ma", pytest.fail)   # stored MA200 only
+    found = 0
+    for symbol in symbols:
+        df = strategy.get_df(symbol)
+        expected = reference_signals(df.astype(float), 10)
+        assert strategy.find_v20_signals(df) == expected
+        assert strategy.symbol_signals(symbol) == expected
+        found += len(expected)
+    assert found
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import backtest
+import benchmark
+import optimize
+import sweep
+import walkforward
+
+T, W, L = (10, 20, 30), (50, 200), (60, 125, 300)
+
+
+@pytest.fixture(scope="module")
+def panel():
+    return benchmark.synthetic_panel(200, 600, 2, 0.02)
+
+
+def run(panel, min_trades):
+    bulk, symbols = panel
+    return walkforward.walk_forward(250, 63, thresholds=T, ma_windows=W, lookbacks=L,
+                                    bulk=bulk, symbols=symbols, workers=1,
+                                    min_trades=min_trades)
+
+
+def test_windows_match_per_window_reference(panel):
+    bulk, symbols = panel
+    report = run(panel, min_trades=1)
+    bounds = walkforward.windows(len(bulk), 250, 63)
+    assert len(report["windows"]) == len(bounds)
+    dates = [str(d.date()) for d in bulk.dates]
+    cube = sweep.evaluate(sweep.streak_table(bulk, symbols, W), T)
+    for (_, split, stop), window in zip(bounds, report["windows"]):
+        top = optimize.optimize(T, W, [n for n in L if n <= 250], bulk=bulk, symbols=symbols,
+                                stop=split, workers=1, min_trades=1)[0]
+        if top["avg_return_pct"] is None:
+            assert window["params"] is None
+            continue
+        params = window["params"]
+        assert (params["threshold"], params["ma_window"], params["lookback"]) == \
+            (top["threshold"], top["ma_window"], top["lookback"])
+        rows = [r for r in cube["results"][(params["threshold"], params["ma_window"])]
+                if dates[split] <= r["SignalDate"] < dates[stop]]
+        expected = backtest.backtest(rows, bulk.slice(None, stop))["summary"]
+        for name, value in expected.items():
+            assert window["test"][name] == pytest.approx(value, abs=1e-6)
+
+
+def test_window_without_winner(panel):
+    bulk, symbols = panel
+    busiest = [max(r["entered"] for r in optimize.optimize(
+        T, W, [n for n in L if n <= 250], bulk=bulk, symbols=symbols, stop=split,
+        workers=1, min_trades=1)) for _, split, _ in walkforward.windows(len(bulk), 250, 63)]
+    assert min(busiest) < max(busiest)
+
+    report = run(panel, min_trades=max(busiest))
+    chosen = [w for w in report["windows"] if w["params"] is not None]
+    assert 0 < len(chosen) < len(report["windows"])
+    assert all(w["test"] is None and w["train"] is None
+               for w in report["windows"] if w["params"] is None)
+    assert report["summary"]["entered"] == sum(w["test"]["entered"] for w in chosen)
+
+    report = run(panel, min_trades=10**6)
+    assert all(w["params"] is None for w in report["windows"])
+    assert report["summary"]["entered"] == 0
+
+
+def test_simulate_on_empty_panel(panel):
+    bulk, symbols = panel
+    trades = backtest.simulate(bulk.slice(100, 100), [s + ".NS" for s in symbols[:3]],
+                               np.array([0, 2]), np.array([-1, -1]),
+                               np.array([1.0, 2.0]), np.array([2.0, 3.0]))
+    assert not trades["entered"].any()
+    assert (trades["entry_row"] == -1).all()
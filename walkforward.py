@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+walkforward.py – Walk-forward evaluation of the V20 parameters
+The price history is split into rolling windows: optimize on a train
+window, then trade the winning parameters on the test window right after
+it. How often the winner changes, and how its test results compare with
+its train results, shows how stable the parameters really are.
+
+Streaks and moving averages only look backwards, so one streak table per
+symbol shard serves every window; each window only adds a trade
+simulation up to its cut-off. All train windows go to the process pool as
+a single batch, and all test windows go as a second batch.
+
+    report = walkforward.walk_forward(train=250, test=63)
+    [(w["test_start"], w["params"], w["test"]["avg_return_pct"]) for w in report["windows"]]
+    report["summary"]     # test windows combined
+"""
+
+import numpy as np
+
+import backtest
+import optimize
+import strategy
+
+
+def windows(n_rows: int, train: int, test: int, step: int | None = None) -> list[tuple]:
+    """``(start, split, stop)`` row bounds of each complete train/test pair."""
+    step = step or test
+    return [(a, a + train, a + train + test)
+            for a in range(0, n_rows - train - test + 1, step)]
+
+
+def walk_forward(train: int = 250, test: int = 63, step: int | None = None,
+                 thresholds=(10, 15, 20, 25, 30), ma_windows=(50, 100, 200),
+                 lookbacks=(125, 250), bulk=None, symbols: list[str] | None = None,
+                 metric: str = "avg_return_pct", min_trades: int = 10,
+                 workers: int | None = None) -> dict:
+    """Optimize on each train window and evaluate on the next ``test`` rows.
+
+    Look-backs longer than ``train`` are dropped. Returns ``windows``: one
+    row per window with its dates, the chosen ``params`` and ``train`` and
+    ``test`` metrics (``params`` is None when no set reached
+    ``min_trades``), and ``summary``, the metrics of all test trades
+    combined.
+    """
+    bulk = strategy._get_bulk() if bulk is None else bulk
+    symbols = strategy.all_stocks if symbols is None else list(symbols)
+    bounds = windows(len(bulk), train, test, step)
+    lookbacks = [n for n in lookbacks if n <= train] or [train]
+    params = optimize.param_grid(thresholds, ma_windows, lookbacks)
+
+    train_totals = optimize.grid_totals(
+        bulk, symbols, ma_windows, [(split, params) for _, split, _ in bounds], workers)
+    best = []
+    for tot in train_totals:
+        rows = [dict(zip(("threshold", "ma_window", "lookback"), p), **m)
+                for p, m in zip(params, backtest.metrics(tot))]
+        top = optimize.rank(rows, metric, min_trades)[0]
+        best.append(top if top[metric] is not None and top["entered"] >= min_trades else None)
+
+    test_totals = optimize.grid_totals(
+        bulk, symbols, ma_windows,
+        [(stop, [(top["threshold"], top["ma_window"], test)] if top else [])
+         for (_, _, stop), top in zip(bounds, best)], workers)
+
+    dates = [str(d.date()) for d in bulk.dates]
+    report, tested = [], []
+    for (start, split, stop), top, tot in zip(bounds, best, test_totals):
+        if top is not None:
+            tested.append(tot)
+        report.append({
+            "train_start": dates[start], "train_end": dates[split - 1],
+            "test_start": dates[split], "test_end": dates[stop - 1],
+            "params": None if top is None else
+            {k: top[k] for k in ("threshold", "ma_window", "lookback")},
+            "train": None if top is None else
+            {k: v for k, v in top.items() if k not in ("threshold", "ma_window", "lookback")},
+            "test": backtest.metrics(tot)[0] if top is not None else None,
+        })
+    summary = backtest.metrics(optimize._combine(tested) if tested else
+                               np.array([[0, 0, 0, 0, 0, np.inf]], dtype=float))[0]
+    return {"windows": report, "summary": summary}